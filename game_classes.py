@@ -7,7 +7,8 @@ from npc_interaction_system import NPCInteractionManager
 from constants import *
 from game_enums import Direction, TimeOfDay, Weather, EventType
 from sprite_manager import SpriteManager
-from particle_system import ParticleSystem
+from particle_system import ParticleSystem, FootstepParticles
+from text_cache import render_text
 import logging
 
 logging.basicConfig(level=logging.DEBUG if __debug__ else logging.INFO)
@@ -15,10 +16,14 @@ logger = logging.getLogger(__name__)
 
 import pygame
 import math
-from enum import Enum
+from enum import Enum, IntEnum
 from dataclasses import dataclass
 from typing import List, Tuple, Optional
 import random
+import re
+from collections import deque
+import bisect
+import itertools
 import textwrap
 import sys
 from pygame import gfxdraw
@@ -51,19 +56,20 @@ def is_near_fountain(npc, game_map):
     return distance <= 250  # pixels
 
 
+_FOUNTAIN_TOPICS = (
+    "The fountain has been the heart of our town for generations.",
+    "I love watching the water dance in the sunlight.",
+    "This fountain holds so many memories of our community.",
+    "The way light reflects on the water is truly magical.",
+    "Every drop tells a story of our town's history."
+)
+
+
 def fountain_conversation_responses(npc, environment_state, player_message, game_map):
     """
     Generate context-specific responses about the fountain
     Only if NPC is near the fountain
     """
-    fountain_topics = [
-        "The fountain has been the heart of our town for generations.",
-        "I love watching the water dance in the sunlight.",
-        "This fountain holds so many memories of our community.",
-        "The way light reflects on the water is truly magical.",
-        "Every drop tells a story of our town's history."
-    ]
-
     # Check if NPC is near the fountain
     if not is_near_fountain(npc, game_map):
         # If not near fountain, use a generic response
@@ -71,7 +77,7 @@ def fountain_conversation_responses(npc, environment_state, player_message, game
 
     # If no specific message, return a random fountain-related comment
     if not player_message or len(player_message.strip()) < 3:
-        return random.choice(fountain_topics)
+        return random.choice(_FOUNTAIN_TOPICS)
 
     # Use the NLP model for more nuanced responses
     try:
@@ -79,11 +85,11 @@ def fountain_conversation_responses(npc, environment_state, player_message, game
 
         # Blend in fountain-specific flavor if response is too short
         if len(base_response) < 20:
-            base_response += " " + random.choice(fountain_topics)
+            base_response += " " + random.choice(_FOUNTAIN_TOPICS)
 
         return base_response
     except Exception:
-        return random.choice(fountain_topics)
+        return random.choice(_FOUNTAIN_TOPICS)
 
 
 def create_fountain_interaction_npcs(game_map, map_width, map_height):
@@ -149,9 +155,12 @@ class Entity:
         return pygame.Rect(self.x, self.y, self.width, self.height)
 
     def distance_to(self, other: 'Entity') -> float:
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+    def distance_sq_to(self, other: 'Entity') -> float:
         dx = self.x - other.x
         dy = self.y - other.y
-        return math.sqrt(dx * dx + dy * dy)
+        return dx * dx + dy * dy
 
 
 class Obstacle(Entity):
@@ -254,6 +263,53 @@ def load_character_spritesheet(filename, sprite_width=32, sprite_height=32, colo
         }
 
 
+# Facing for a movement step, keyed by the sign of its dominant axis.
+# Ties go to the vertical axis and a zero step faces up.
+_DIR_TABLE = {
+    (1, 0): Direction.RIGHT,
+    (-1, 0): Direction.LEFT,
+    (0, 1): Direction.DOWN,
+    (0, -1): Direction.UP,
+    (0, 0): Direction.UP,
+}
+
+
+def _direction_for(dx, dy):
+    """Direction to face when moving by (dx, dy)"""
+    if abs(dx) > abs(dy):
+        return _DIR_TABLE[((dx > 0) - (dx < 0), 0)]
+    return _DIR_TABLE[(0, (dy > 0) - (dy < 0))]
+
+
+# Held movement keys as bits: 1 left, 2 right, 4 up, 8 down
+_MOVE_KEY_BITS = {
+    pygame.K_LEFT: 1, pygame.K_a: 1,
+    pygame.K_RIGHT: 2, pygame.K_d: 2,
+    pygame.K_UP: 4, pygame.K_w: 4,
+    pygame.K_DOWN: 8, pygame.K_s: 8,
+}
+
+
+def _move_for_mask(mask):
+    """(x sign, y sign, facing) for a held-key mask; left beats right and up beats down"""
+    sign_x = -1 if mask & 1 else (1 if mask & 2 else 0)
+    sign_y = -1 if mask & 4 else (1 if mask & 8 else 0)
+    if sign_y:
+        return sign_x, sign_y, Direction.UP if sign_y < 0 else Direction.DOWN
+    if sign_x:
+        return sign_x, sign_y, Direction.LEFT if sign_x < 0 else Direction.RIGHT
+    return 0, 0, None
+
+
+# Indexed by held-key mask
+_MOVE_BY_MASK = tuple(_move_for_mask(mask) for mask in range(16))
+
+
+def _frames_by_direction(sprites):
+    """Frame lists from a Direction-keyed sprite dict, indexed by Direction value"""
+    return tuple(sprites[direction] for direction in sorted(Direction, key=lambda d: d.value))
+
+
 class MovingEntity(Entity):
     """Base class for entities that can move"""
 
@@ -270,8 +326,11 @@ class MovingEntity(Entity):
         self.path = []
         self.target_x = None
         self.target_y = None
+        # Sub-pixel motion left over from move_towards_target
+        self._fx = 0.0
+        self._fy = 0.0
 
-    def update(self, game_map, game_state, player):
+    def update(self, game_map, game_state, player, now_ms=None):
         """Update method for moving entities"""
         # You can add common update logic for all moving entities here
         pass
@@ -282,40 +341,44 @@ class MovingEntity(Entity):
         new_y = self.y + dy
 
         # Update direction
-        if abs(dx) > abs(dy):
-            self.direction = Direction.RIGHT if dx > 0 else Direction.LEFT
-        else:
-            self.direction = Direction.DOWN if dy > 0 else Direction.UP
+        self.direction = _direction_for(dx, dy)
 
         # Check boundary collisions
         if new_x < 0 or new_x > game_map.width - self.width or new_y < 0 or new_y > game_map.height - self.height:
             return False
 
-        # Check collision with obstacles
+        # Check collision with obstacles; collidelist runs the AABB sweep in C
+        # against the rects GameMap caches when obstacles are added
+        obstacle_rects = game_map._obstacle_rects
         temp_rect = pygame.Rect(new_x, new_y, self.width, self.height)
-        for obstacle in game_map.obstacles:
-            if temp_rect.colliderect(obstacle.get_rect()):
-                # Try to slide along the obstacle
-                slide_x, slide_y = new_x, new_y
-
-                # Check horizontal sliding
-                if not any(temp_rect.move(-self.speed, 0).colliderect(obs.get_rect()) for obs in game_map.obstacles):
-                    slide_x -= self.speed
-                elif not any(temp_rect.move(self.speed, 0).colliderect(obs.get_rect()) for obs in game_map.obstacles):
-                    slide_x += self.speed
-
-                # Check vertical sliding
-                if not any(temp_rect.move(0, -self.speed).colliderect(obs.get_rect()) for obs in game_map.obstacles):
-                    slide_y -= self.speed
-                elif not any(temp_rect.move(0, self.speed).colliderect(obs.get_rect()) for obs in game_map.obstacles):
-                    slide_y += self.speed
-
-                # If we can slide, update the position
-                if slide_x != new_x or slide_y != new_y:
-                    new_x, new_y = slide_x, slide_y
-                else:
-                    # If we can't slide, stop movement in this direction
-                    return False
+        if temp_rect.collidelist(obstacle_rects) != -1:
+            # The slide probes only ever reach one step further, so narrow the
+            # sweep to the obstacles within a step of the blocked position
+            speed = self.speed
+            obstacle_rects = [obstacle_rects[i] for i in
+                              temp_rect.inflate(2 * speed, 2 * speed).collidelistall(obstacle_rects)]
+
+            # Try to slide along the obstacle
+            slide_x, slide_y = new_x, new_y
+
+            # Check horizontal sliding
+            if temp_rect.move(-self.speed, 0).collidelist(obstacle_rects) == -1:
+                slide_x -= self.speed
+            elif temp_rect.move(self.speed, 0).collidelist(obstacle_rects) == -1:
+                slide_x += self.speed
+
+            # Check vertical sliding
+            if temp_rect.move(0, -self.speed).collidelist(obstacle_rects) == -1:
+                slide_y -= self.speed
+            elif temp_rect.move(0, self.speed).collidelist(obstacle_rects) == -1:
+                slide_y += self.speed
+
+            # If we can slide, update the position
+            if slide_x != new_x or slide_y != new_y:
+                new_x, new_y = slide_x, slide_y
+            else:
+                # If we can't slide, stop movement in this direction
+                return False
 
         # Move if no collision
         self.x = new_x
@@ -334,24 +397,34 @@ class MovingEntity(Entity):
 
         dx = self.target_x - self.x
         dy = self.target_y - self.y
+        d2 = dx * dx + dy * dy
 
-        # Calculate direction vector
-        distance = max(1, math.sqrt(dx * dx + dy * dy))
-        dx = dx / distance * self.speed
-        dy = dy / distance * self.speed
-
-        # Move
-        self.move(int(dx), int(dy), game_map)
-
-        # Check if we've reached the target
-        if abs(self.x - self.target_x) < self.speed and abs(self.y - self.target_y) < self.speed:
+        # Close enough to cover in one step: snap onto the target
+        if d2 <= self.speed * self.speed:
+            self.move(dx, dy, game_map)
             self.target_x = None
             self.target_y = None
+            self._fx = self._fy = 0.0
+            return
+
+        # Accumulate the fractional step so slow or diagonal motion isn't truncated away
+        inv = self.speed / math.sqrt(d2)
+        self._fx += dx * inv
+        self._fy += dy * inv
+        step_x = int(round(self._fx))
+        step_y = int(round(self._fy))
+        self._fx -= step_x
+        self._fy -= step_y
+
+        self.move(step_x, step_y, game_map)
 
 
 class GameMap:
     """Game world map with rooms and entities"""
 
+    # Spatial hash bucket size; interaction queries then touch a 3x3 block of buckets
+    _CELL_SIZE = INTERACTION_DISTANCE
+
     def __init__(self, width: int, height: int):
         self.width = width
         self.height = height
@@ -359,43 +432,118 @@ class GameMap:
         self.npcs = []
         self.items = []
         self.obstacles = []
+        # Parallel rect lists so render can cull with Rect.collidelistall
+        self._room_rects = []
+        self._obstacle_rects = []
+        self._obstacle_surfaces = []
+        self._static_bake = None  # Floors, borders and paths; built on first render
+        # Id lookups and a coarse TILE_SIZE grid of candidate rooms per cell
+        self._rooms_by_id = {}
+        self._npcs_by_id = {}
+        self._room_grid = {}
+        self._items_by_room = {}  # room_id -> items lying inside that room
+        self._room_bounds = {}  # room_id -> (x_min, x_max, y_min, y_max)
+        # Spatial hashes of NPCs and items in _CELL_SIZE buckets for proximity queries
+        self._npc_cells = {}
+        self._item_cells = {}
 
     def add_room(self, room: 'Room'):
         """Add a room to the map"""
         self.rooms.append(room)
+        self._room_rects.append(pygame.Rect(room.x, room.y, room.width, room.height))
+        self._rooms_by_id.setdefault(room.room_id, room)
+        self._static_bake = None
+
+        # Rasterize the room's bounds (edges inclusive, like contains_point)
+        for cx in range(room.x // TILE_SIZE, (room.x + room.width) // TILE_SIZE + 1):
+            for cy in range(room.y // TILE_SIZE, (room.y + room.height) // TILE_SIZE + 1):
+                self._room_grid.setdefault((cx, cy), []).append(room)
+
+        # Pick up items that were placed before this room existed
+        room_items = [item for item in self.items if room.contains_point(item.x, item.y)]
+        if room_items:
+            self._items_by_room.setdefault(room.room_id, []).extend(room_items)
 
     def add_npc(self, npc: 'NPC'):
         """Add an NPC to the map"""
         self.npcs.append(npc)
+        self._npcs_by_id.setdefault(npc.entity_id, npc)
+        npc._map_cell = self._cell_of(npc.x, npc.y)
+        self._npc_cells.setdefault(npc._map_cell, []).append(npc)
+
+    def update_npc_cell(self, npc: 'NPC'):
+        """Move an NPC to its new spatial hash bucket after it changes position"""
+        cell = self._cell_of(npc.x, npc.y)
+        old_cell = getattr(npc, '_map_cell', None)
+        if cell == old_cell:
+            return
+        # Entities compare by value, so find the NPC in its old bucket by identity
+        for i, other in enumerate(self._npc_cells.get(old_cell, ())):
+            if other is npc:
+                del self._npc_cells[old_cell][i]
+                break
+        npc._map_cell = cell
+        self._npc_cells.setdefault(cell, []).append(npc)
+
+    @staticmethod
+    def _cell_of(x, y):
+        """Spatial hash bucket for a position"""
+        return int(x) // GameMap._CELL_SIZE, int(y) // GameMap._CELL_SIZE
+
+    def _cells_near(self, cells, x, y, radius):
+        """Yield the contents of every bucket a circle of radius around (x, y) can reach"""
+        cx, cy = self._cell_of(x, y)
+        span = -(-int(radius) // GameMap._CELL_SIZE)
+        for i in range(cx - span, cx + span + 1):
+            for j in range(cy - span, cy + span + 1):
+                bucket = cells.get((i, j))
+                if bucket:
+                    yield from bucket
 
     def add_item(self, item: 'Item'):
         """Add an item to the map"""
         self.items.append(item)
+        self._item_cells.setdefault(self._cell_of(item.x, item.y), []).append(item)
+
+        # Items don't move, so resolve their room(s) once here
+        item.location_id = None
+        for room in self._room_grid.get((item.x // TILE_SIZE, item.y // TILE_SIZE), ()):
+            if room.contains_point(item.x, item.y):
+                if item.location_id is None:
+                    item.location_id = room.room_id
+                self._items_by_room.setdefault(room.room_id, []).append(item)
 
     def add_obstacle(self, obstacle: 'Obstacle'):
         """Add an obstacle to the map"""
         self.obstacles.append(obstacle)
+        self._obstacle_rects.append(obstacle.get_rect())
+        self._obstacle_surfaces.append(None)  # Baked on first render
 
     def get_room_by_id(self, room_id: str) -> Optional['Room']:
         """Get a room by its ID"""
-        for room in self.rooms:
-            if room.room_id == room_id:
-                return room
-        return None
+        return self._rooms_by_id.get(room_id)
+
+    def get_room_bounds(self, room_id: str) -> Optional[Tuple[int, int, int, int]]:
+        """Get a room's (x_min, x_max, y_min, y_max), computed once per room"""
+        bounds = self._room_bounds.get(room_id)
+        if bounds is None:
+            room = self._rooms_by_id.get(room_id)
+            if room is None:
+                return None
+            bounds = (room.x, room.x + room.width, room.y, room.y + room.height)
+            self._room_bounds[room_id] = bounds
+        return bounds
 
     def get_room_at_position(self, x: int, y: int) -> Optional['Room']:
         """Get the room at a specific position"""
-        for room in self.rooms:
+        for room in self._room_grid.get((int(x) // TILE_SIZE, int(y) // TILE_SIZE), ()):
             if room.contains_point(x, y):
                 return room
         return None
 
     def get_npc_by_id(self, npc_id: str) -> Optional['NPC']:
         """Get an NPC by ID"""
-        for npc in self.npcs:
-            if npc.entity_id == npc_id:
-                return npc
-        return None
+        return self._npcs_by_id.get(npc_id)
 
     def get_npcs_in_room(self, room_id: str) -> List['NPC']:
         """Get all NPCs in a specific room"""
@@ -403,159 +551,206 @@ class GameMap:
 
     def get_items_in_room(self, room_id: str) -> List['Item']:
         """Get all items in a specific room"""
-        room = self.get_room_by_id(room_id)
-        if not room:
-            return []
-
-        return [item for item in self.items
-                if not item.is_collected and
-                room.contains_point(item.x, item.y)]
+        return [item for item in self._items_by_room.get(room_id, ())
+                if not item.is_collected]
 
     def get_items_near_position(self, x: int, y: int, radius: int) -> List['Item']:
         """Get items near a position"""
-        return [item for item in self.items
+        hypot = math.hypot
+        return [item for item in self._cells_near(self._item_cells, x, y, radius)
                 if not item.is_collected and
-                math.sqrt((item.x - x) ** 2 + (item.y - y) ** 2) <= radius]
+                hypot(item.x - x, item.y - y) <= radius]
+
+    def get_npcs_near_position(self, x: int, y: int, radius: float) -> List['NPC']:
+        """Get every NPC within radius of a position"""
+        radius_sq = radius * radius
+        return [npc for npc in self._cells_near(self._npc_cells, x, y, radius)
+                if (npc.x - x) ** 2 + (npc.y - y) ** 2 <= radius_sq]
 
     def get_npc_near_position(self, x: int, y: int, radius: int) -> Optional['NPC']:
         """Get the closest NPC near a position"""
-        nearby_npcs = []
-        for npc in self.npcs:
-            distance = math.sqrt((npc.x - x) ** 2 + (npc.y - y) ** 2)
-            if distance <= radius:
-                nearby_npcs.append((npc, distance))
-
-        if not nearby_npcs:
+        hypot = math.hypot
+        distance, npc = min(((hypot(npc.x - x, npc.y - y), npc)
+                             for npc in self._cells_near(self._npc_cells, x, y, radius)),
+                            key=lambda pair: pair[0], default=(None, None))
+        if npc is None or distance > radius:
             return None
-
-        # Return the closest NPC
-        nearby_npcs.sort(key=lambda x: x[1])
-        return nearby_npcs[0][0]
+        return npc
 
     def render(self, surface, camera_x, camera_y):
         """Render the entire map with enhanced visuals"""
+        # Room floors, borders and paths never change, so they are drawn once
+        # onto a map-sized surface and each frame just copies the visible part
+        if self._static_bake is None:
+            self._static_bake = self._bake_static_layer()
+
+        # World-space viewport; anything outside it is skipped entirely
+        view = pygame.Rect(camera_x, camera_y, surface.get_width(), surface.get_height())
+        if not self._static_bake.get_rect().contains(view):
+            # Fill background
+            surface.fill((50, 50, 50))  # Dark background color
+        surface.blit(self._static_bake, (0, 0), view)
+
+        # Animated room effects go on top of the baked floors
+        rooms = self.rooms
+        for i in view.collidelistall(self._room_rects):
+            self._draw_room_effects(surface, rooms[i], camera_x, camera_y)
+
+        # Draw obstacles with enhanced visuals, all in one blits call
+        obstacles = self.obstacles
+        obstacle_surfaces = self._obstacle_surfaces
+        obstacle_blits = []
+        for index in view.collidelistall(self._obstacle_rects):
+            obstacle = obstacles[index]
+            if isinstance(obstacle, SpriteObstacle) and obstacle.sprite:
+                # Sprites can change between frames (animation), so use the live one
+                obstacle_surface = obstacle.sprite
+            else:
+                obstacle_surface = obstacle_surfaces[index]
+                if obstacle_surface is None:
+                    obstacle_surface = obstacle_surfaces[index] = self._bake_obstacle(obstacle)
+            obstacle_blits.append((obstacle_surface, (obstacle.x - camera_x, obstacle.y - camera_y)))
+        surface.blits(obstacle_blits, doreturn=False)
+
+    def _bake_static_layer(self):
+        """Draw every room's floor and border, and the paths between rooms, onto one surface"""
+        bake = pygame.Surface((self.width, self.height))
+
         # Fill background
-        surface.fill((50, 50, 50))  # Dark background color
+        bake.fill((50, 50, 50))  # Dark background color
 
         # Draw rooms with better visuals
         for room in self.rooms:
-            room_rect = pygame.Rect(
-                room.x - camera_x,
-                room.y - camera_y,
-                room.width,
-                room.height
+            self._draw_room_base(bake, room, 0, 0)
+
+        # Draw paths between rooms
+        self._draw_paths(bake, 0, 0)
+
+        return bake.convert()
+
+    def _draw_room_base(self, surface, room, camera_x, camera_y):
+        """Draw a room's floor, floor pattern and border"""
+        room_rect = pygame.Rect(
+            room.x - camera_x,
+            room.y - camera_y,
+            room.width,
+            room.height
+        )
+
+        # Draw main floor
+        pygame.draw.rect(surface, room.floor_color, room_rect)
+
+        # Add special rendering for fountain in village_square
+        if room.room_id == "village_square":
+            # Draw cobblestone pattern
+            stone_size = 16
+            for x in range(room.x, room.x + room.width, stone_size):
+                for y in range(room.y, room.y + room.height, stone_size):
+                    if (x // stone_size + y // stone_size) % 2 == 0:
+                        rect = pygame.Rect(
+                            x - camera_x,
+                            y - camera_y,
+                            stone_size,
+                            stone_size
+                        )
+                        pygame.draw.rect(surface, (180, 180, 180), rect)
+                        pygame.draw.rect(surface, (100, 100, 100), rect, 1)
+
+        elif room.room_id == "tavern":
+            # Draw wooden floor pattern
+            plank_width = 20
+            for y in range(room.y, room.y + room.height, plank_width):
+                rect = pygame.Rect(
+                    room.x - camera_x,
+                    y - camera_y,
+                    room.width,
+                    plank_width
+                )
+                color = (110, 60, 20) if (y // plank_width) % 2 == 0 else (130, 70, 20)
+                pygame.draw.rect(surface, color, rect)
+                pygame.draw.rect(surface, (80, 40, 10), rect, 1)
+
+        # Draw border with depth effect
+        for thickness in range(3, 0, -1):
+            border_color = (
+                max(0, DARK_GRAY[0] - thickness * 20),
+                max(0, DARK_GRAY[1] - thickness * 20),
+                max(0, DARK_GRAY[2] - thickness * 20)
             )
+            pygame.draw.rect(surface, border_color, room_rect, thickness)
 
-            # Draw main floor
-            pygame.draw.rect(surface, room.floor_color, room_rect)
-
-            # Add special rendering for fountain in village_square
-            if room.room_id == "village_square":
-                # Draw cobblestone pattern
-                stone_size = 16
-                for x in range(room.x, room.x + room.width, stone_size):
-                    for y in range(room.y, room.y + room.height, stone_size):
-                        if (x // stone_size + y // stone_size) % 2 == 0:
-                            rect = pygame.Rect(
-                                x - camera_x,
-                                y - camera_y,
-                                stone_size,
-                                stone_size
-                            )
-                            pygame.draw.rect(surface, (180, 180, 180), rect)
-                            pygame.draw.rect(surface, (100, 100, 100), rect, 1)
-
-            elif room.room_id == "tavern":
-                # Draw wooden floor pattern
-                plank_width = 20
-                for y in range(room.y, room.y + room.height, plank_width):
-                    rect = pygame.Rect(
-                        room.x - camera_x,
-                        y - camera_y,
-                        room.width,
-                        plank_width
-                    )
-                    color = (110, 60, 20) if (y // plank_width) % 2 == 0 else (130, 70, 20)
-                    pygame.draw.rect(surface, color, rect)
-                    pygame.draw.rect(surface, (80, 40, 10), rect, 1)
-
-                # Draw some ambient particles (dust motes in tavern light)
+    def _draw_room_effects(self, surface, room, camera_x, camera_y):
+        """Draw a room's animated details (light, dust, foliage, fireflies)"""
+        if room.room_id == "tavern":
+            # Draw some ambient particles (dust motes in tavern light)
+            current_time = pygame.time.get_ticks()
+            light_x = room.x + room.width // 2 - camera_x
+            light_y = room.y + 50 - camera_y
+
+            # Draw light beam
+            beam_surface = pygame.Surface((100, 150), pygame.SRCALPHA)
+            for i in range(100):
+                alpha = max(5, 50 - i // 2)
+                pygame.draw.line(beam_surface, (255, 220, 150, alpha),
+                                 (50, 0), (50 - i // 2, i), 2)
+                pygame.draw.line(beam_surface, (255, 220, 150, alpha),
+                                 (50, 0), (50 + i // 2, i), 2)
+            surface.blit(beam_surface, (light_x - 50, light_y))
+
+            # Dust particles
+            for i in range(10):
+                particle_x = light_x - 40 + math.sin((current_time + i * 100) / 500) * 30 + i * 8
+                particle_y = light_y + 20 + (current_time % 1000) / 1000 * 100 + i * 10
+                alpha = 100 - (particle_y - light_y) // 2
+                if 0 <= particle_y - light_y <= 150:
+                    pygame.draw.circle(surface, (255, 220, 150, alpha),
+                                       (int(particle_x), int(particle_y)), 1)
+
+        elif room.room_id in ["deep_forest", "forest_edge", "hidden_glade"]:
+            # Draw organic ground pattern for forest areas
+            for i in range(50):  # Random grass/foliage patches
+                patch_x = random.randint(room.x, room.x + room.width - 10)
+                patch_y = random.randint(room.y, room.y + room.height - 10)
+                patch_size = random.randint(5, 15)
+
+                if (patch_x - camera_x >= 0 and patch_x - camera_x <= SCREEN_WIDTH and
+                        patch_y - camera_y >= 0 and patch_y - camera_y <= SCREEN_HEIGHT):
+                    # Random green shade
+                    green_value = random.randint(100, 200)
+                    color = (0, green_value, 0, 150)
+
+                    # Draw grass patch
+                    gfxdraw.filled_circle(surface,
+                                          patch_x - camera_x,
+                                          patch_y - camera_y,
+                                          patch_size, color)
+
+            # Add floating particles for forest (pollen/fireflies)
+            if room.room_id == "hidden_glade":
                 current_time = pygame.time.get_ticks()
-                light_x = room.x + room.width // 2 - camera_x
-                light_y = room.y + 50 - camera_y
-
-                # Draw light beam
-                beam_surface = pygame.Surface((100, 150), pygame.SRCALPHA)
-                for i in range(100):
-                    alpha = max(5, 50 - i // 2)
-                    pygame.draw.line(beam_surface, (255, 220, 150, alpha),
-                                     (50, 0), (50 - i // 2, i), 2)
-                    pygame.draw.line(beam_surface, (255, 220, 150, alpha),
-                                     (50, 0), (50 + i // 2, i), 2)
-                surface.blit(beam_surface, (light_x - 50, light_y))
-
-                # Dust particles
-                for i in range(10):
-                    particle_x = light_x - 40 + math.sin((current_time + i * 100) / 500) * 30 + i * 8
-                    particle_y = light_y + 20 + (current_time % 1000) / 1000 * 100 + i * 10
-                    alpha = 100 - (particle_y - light_y) // 2
-                    if 0 <= particle_y - light_y <= 150:
-                        pygame.draw.circle(surface, (255, 220, 150, alpha),
-                                           (int(particle_x), int(particle_y)), 1)
-
-            elif room.room_id in ["deep_forest", "forest_edge", "hidden_glade"]:
-                # Draw organic ground pattern for forest areas
-                for i in range(50):  # Random grass/foliage patches
-                    patch_x = random.randint(room.x, room.x + room.width - 10)
-                    patch_y = random.randint(room.y, room.y + room.height - 10)
-                    patch_size = random.randint(5, 15)
-
-                    if (patch_x - camera_x >= 0 and patch_x - camera_x <= SCREEN_WIDTH and
-                            patch_y - camera_y >= 0 and patch_y - camera_y <= SCREEN_HEIGHT):
-                        # Random green shade
-                        green_value = random.randint(100, 200)
-                        color = (0, green_value, 0, 150)
-
-                        # Draw grass patch
-                        gfxdraw.filled_circle(surface,
-                                              patch_x - camera_x,
-                                              patch_y - camera_y,
-                                              patch_size, color)
-
-                # Add floating particles for forest (pollen/fireflies)
-                if room.room_id == "hidden_glade":
-                    current_time = pygame.time.get_ticks()
-                    for i in range(20):
-                        # Circular motion
-                        angle = (current_time / 2000 + i / 3) * math.pi * 2
-                        radius = 30 + 10 * math.sin(current_time / 1000 + i)
-
-                        particle_x = room.x + room.width // 2 - camera_x + math.cos(angle) * radius
-                        particle_y = room.y + room.height // 2 - camera_y + math.sin(angle) * radius
-
-                        # Pulsing size and alpha
-                        pulse = (math.sin(current_time / 200 + i) + 1) / 2
-                        size = 1 + pulse
-                        alpha = int(100 + 100 * pulse)
-
-                        # Draw firefly/pollen
-                        gfxdraw.filled_circle(surface,
-                                              int(particle_x), int(particle_y),
-                                              int(size), (220, 220, 100, alpha))
-
-            # Draw border with depth effect
-            for thickness in range(3, 0, -1):
-                border_color = (
-                    max(0, DARK_GRAY[0] - thickness * 20),
-                    max(0, DARK_GRAY[1] - thickness * 20),
-                    max(0, DARK_GRAY[2] - thickness * 20)
-                )
-                pygame.draw.rect(surface, border_color, room_rect, thickness)
+                for i in range(20):
+                    # Circular motion
+                    angle = (current_time / 2000 + i / 3) * math.pi * 2
+                    radius = 30 + 10 * math.sin(current_time / 1000 + i)
 
-        # Draw paths between rooms
+                    particle_x = room.x + room.width // 2 - camera_x + math.cos(angle) * radius
+                    particle_y = room.y + room.height // 2 - camera_y + math.sin(angle) * radius
+
+                    # Pulsing size and alpha
+                    pulse = (math.sin(current_time / 200 + i) + 1) / 2
+                    size = 1 + pulse
+                    alpha = int(100 + 100 * pulse)
+
+                    # Draw firefly/pollen
+                    gfxdraw.filled_circle(surface,
+                                          int(particle_x), int(particle_y),
+                                          int(size), (220, 220, 100, alpha))
+
+    def _draw_paths(self, surface, camera_x, camera_y):
+        """Draw the paths between connected rooms"""
         for room in self.rooms:
-            for direction, connected_room_id in room.exits.items():
-                connected_room = self.get_room_by_id(connected_room_id)
+            for direction in room.exits:
+                connected_room = room.resolve_exit(direction, self)
                 if connected_room:
                     # Calculate start and end points for path
                     if direction == "north":
@@ -636,40 +831,39 @@ class GameMap:
                             detail_color = (150, 140, 130) if i % 2 == 0 else (170, 160, 150)
                             pygame.draw.rect(surface, detail_color, detail_rect)
 
-        # Draw obstacles with enhanced visuals
-        for obstacle in self.obstacles:
-            obstacle_x = obstacle.x - camera_x
-            obstacle_y = obstacle.y - camera_y
+    @staticmethod
+    def _bake_obstacle(obstacle):
+        """Pre-render a plain obstacle's shaded block so render only has to blit it"""
+        baked = pygame.Surface((obstacle.width, obstacle.height))
+        baked.fill(obstacle.color)
 
-            if isinstance(obstacle, SpriteObstacle) and obstacle.sprite:
-                surface.blit(obstacle.sprite, (obstacle_x, obstacle_y))
-            else:
-                obstacle_rect = pygame.Rect(obstacle_x, obstacle_y, obstacle.width, obstacle.height)
-                pygame.draw.rect(surface, obstacle.color, obstacle_rect)
+        # Add simple highlight/shadow for 3D effect
+        highlight_rect = pygame.Rect(0, 0, obstacle.width, obstacle.height // 4)
+        shadow_rect = pygame.Rect(0, 3 * obstacle.height // 4, obstacle.width, obstacle.height // 4)
 
-                # Add simple highlight/shadow for 3D effect
-                highlight_rect = pygame.Rect(obstacle_rect.x, obstacle_rect.y, obstacle_rect.width,
-                                             obstacle_rect.height // 4)
-                shadow_rect = pygame.Rect(obstacle_rect.x, obstacle_rect.y + 3 * obstacle_rect.height // 4,
-                                          obstacle_rect.width, obstacle_rect.height // 4)
+        # Lighten top
+        highlight = pygame.Surface((highlight_rect.width, highlight_rect.height), pygame.SRCALPHA)
+        highlight.fill((255, 255, 255, 50))
+        baked.blit(highlight, highlight_rect)
 
-                # Lighten top
-                highlight = pygame.Surface((highlight_rect.width, highlight_rect.height), pygame.SRCALPHA)
-                highlight.fill((255, 255, 255, 50))
-                surface.blit(highlight, highlight_rect)
+        # Darken bottom
+        shadow = pygame.Surface((shadow_rect.width, shadow_rect.height), pygame.SRCALPHA)
+        shadow.fill((0, 0, 0, 70))
+        baked.blit(shadow, shadow_rect)
 
-                # Darken bottom
-                shadow = pygame.Surface((shadow_rect.width, shadow_rect.height), pygame.SRCALPHA)
-                shadow.fill((0, 0, 0, 70))
-                surface.blit(shadow, shadow_rect)
+        return baked.convert()
 
 
 class Room:
     """Represents a room or area in the game"""
 
+    __slots__ = ('room_id', 'name', 'x', 'y', 'width', 'height', 'description',
+                 'floor_color', 'npcs', 'items', 'obstacles', 'exits')
+
     def __init__(self, room_id: str, name: str, x: int, y: int,
                  width: int, height: int, description: str):
-        self.room_id = room_id
+        # Interned so the per-frame room id comparisons are identity checks
+        self.room_id = sys.intern(room_id)
         self.name = name
         self.x = x
         self.y = y
@@ -691,6 +885,11 @@ class Room:
         """Get the center point of the room"""
         return self.x + self.width // 2, self.y + self.height // 2
 
+    def resolve_exit(self, direction: str, game_map: 'GameMap') -> Optional['Room']:
+        """Get the room an exit leads to, or None if there is no such exit"""
+        room_id = self.exits.get(direction)
+        return game_map.get_room_by_id(room_id) if room_id is not None else None
+
 
 class Camera:
     """Camera that follows the player"""
@@ -712,11 +911,83 @@ class Camera:
         self.y = max(0, min(self.y, map_height - self.height))
 
 
+# Base tint laid over the screen for each weather type (CLEAR draws nothing)
+_WEATHER_BASE_COLORS = {
+    Weather.CLOUDY: (200, 200, 200, 40),
+    Weather.RAINY: (100, 100, 150, 60),
+    Weather.FOGGY: (255, 255, 255, 100),
+    Weather.STORMY: (50, 50, 70, 100),
+}
+
+
+# Puffs making up each of the five clouds as (offset_x, offset_y, radius), so
+# the cloud shapes aren't recomputed with math.sin on every frame
+_CLOUD_PUFFS = tuple(
+    tuple((j * (100 + i * 30) // 8, math.sin(j * 0.8) * 5, (40 + i * 10) // 2 + j * 5)
+          for j in range(5))
+    for i in range(5)
+)
+
+
+def build_bolt_templates(height, count=8):
+    """
+    Pre-draw a set of random lightning bolts, each on its own transparent surface.
+
+    Args:
+        height (int): Height the bolt spans, top to bottom
+        count (int): Number of different bolts to draw
+
+    Returns:
+        list: (surface, anchor_x) pairs, where anchor_x is the bolt's starting
+            column within the surface
+    """
+    bolt_width = 3
+    pad = (bolt_width + 4) // 2 + 1  # Half the widest glow pass, rounded up
+    templates = []
+    for _ in range(count):
+        # Walk the jagged path first so the surface can be sized to fit it
+        bolt_segments = random.randint(4, 8)
+        segments = []
+        forks = []
+        last_x, last_y = 0, 0
+        for j in range(bolt_segments):
+            next_x = last_x + random.randint(-80, 80)
+            next_y = last_y + height // bolt_segments
+            segments.append(((last_x, last_y), (next_x, next_y)))
+            if random.random() < 0.3:
+                forks.append(((next_x, next_y),
+                              (next_x + random.randint(-40, 40), next_y + random.randint(10, 30))))
+            last_x, last_y = next_x, next_y
+
+        xs = [x for line in segments + forks for x, _ in line]
+        left = min(xs) - pad
+        bolt = pygame.Surface((max(xs) - left + pad, height), pygame.SRCALPHA).convert_alpha()
+        bolt.lock()
+        try:
+            # Widest, faintest glow first so the bright core stays on top
+            for k in range(2, -1, -1):
+                for start, end in segments:
+                    pygame.draw.line(bolt, (200, 200, 255, 150 - k * 50),
+                                     (start[0] - left, start[1]), (end[0] - left, end[1]),
+                                     bolt_width + k * 2)
+            for start, end in segments:
+                pygame.draw.line(bolt, (200, 200, 255, 240),
+                                 (start[0] - left, start[1]), (end[0] - left, end[1]), bolt_width)
+            for start, end in forks:
+                pygame.draw.line(bolt, (200, 200, 255, 200),
+                                 (start[0] - left, start[1]), (end[0] - left, end[1]), bolt_width - 1)
+        finally:
+            bolt.unlock()
+        templates.append((bolt, -left))
+    return templates
+
+
 class GameState:
     """Manages the overall game state"""
 
     def __init__(self):
         self.time_of_day = TimeOfDay.MORNING
+        self.is_dark = False  # Evening or night; kept in step with time_of_day
         self.weather = Weather.CLEAR
         self.days_passed = 1
         self.time_cycle = [TimeOfDay.MORNING, TimeOfDay.AFTERNOON,
@@ -724,6 +995,7 @@ class GameState:
         self.weather_options = [Weather.CLEAR, Weather.CLOUDY,
                                 Weather.RAINY, Weather.FOGGY, Weather.STORMY]
         self.weather_weights = [0.5, 0.25, 0.15, 0.05, 0.05]  # Probabilities
+        self._weather_cum = list(itertools.accumulate(self.weather_weights))
         self.time_last_advanced = pygame.time.get_ticks()
         self.time_per_cycle = DAY_LENGTH // len(self.time_cycle)  # Time per cycle phase
         self.events = {
@@ -731,6 +1003,14 @@ class GameState:
             "merchant_sale": False,
             "festival_preparation": False
         }
+        self._weather_surface = None  # Reused overlay, created on first weather render
+        self._rain_sheet = None  # Seamless pre-drawn rain layer, built on first rainy frame
+        self._flash_surface = None  # Reused lightning flash layer
+        self._time_overlays = {}  # Filled tint surface per (time of day, size)
+        self._weather_key = None  # Inputs the weather layer was last drawn from
+        self._bolt_templates = None  # Pre-drawn lightning bolts, built on the first strike
+        self.lightning_start = 0  # Start and length (ms) of the current lightning flash
+        self.lightning_duration = 0
 
     def update(self):
         """Update game state based on time passage"""
@@ -746,22 +1026,25 @@ class GameState:
         current_index = self.time_cycle.index(self.time_of_day)
         next_index = (current_index + 1) % len(self.time_cycle)
         self.time_of_day = self.time_cycle[next_index]
+        self.is_dark = self.time_of_day in (TimeOfDay.EVENING, TimeOfDay.NIGHT)
 
         # New day begins at morning
         if self.time_of_day == TimeOfDay.MORNING:
             self.days_passed += 1
             # Change weather with the new day
-            self.weather = random.choices(
-                self.weather_options,
-                weights=self.weather_weights,
-                k=1
-            )[0]
+            self.weather = self._pick_weather()
 
             # Trigger special events with low probability
             if random.random() < 0.2:  # 20% chance each new day
                 random_event = random.choice(list(self.events.keys()))
                 self.events[random_event] = True
 
+    def _pick_weather(self):
+        """Pick a weather type by weight using the precomputed cumulative weights"""
+        r = random.random() * self._weather_cum[-1]
+        index = bisect.bisect_right(self._weather_cum, r)
+        return self.weather_options[min(index, len(self.weather_options) - 1)]
+
     def get_environment_state(self, room_id):
         """Get environment state for a specific room"""
         return {
@@ -782,95 +1065,141 @@ class GameState:
         elif self.time_of_day == TimeOfDay.NIGHT:
             return (50, 50, 100, 120)  # Dark blue overlay
 
+    def get_time_overlay(self, width, height):
+        """
+        Get the time of day tint as a ready-filled surface.
+
+        The tint only changes between phases, so each phase's surface is
+        filled once and reused.
+
+        Returns:
+            pygame.Surface or None: The overlay, or None when the phase has no tint
+        """
+        key = (self.time_of_day, width, height)
+        if key not in self._time_overlays:
+            color = self.get_time_color_overlay()
+            overlay = None
+            if color[3]:
+                overlay = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+                overlay.fill(color)
+            self._time_overlays[key] = overlay
+        return self._time_overlays[key]
+
+    def _create_rain_sheet(self, width, height, rain_count=100):
+        """
+        Draw every raindrop once onto a tileable layer.
+
+        All drops drift by the same offset each frame, so scrolling this one
+        surface replaces a line draw per drop. Drops crossing an edge are drawn
+        again on the opposite side so the tiles join without seams.
+        """
+        angle = math.pi / 6  # 30 degrees
+        sin_angle, cos_angle = math.sin(angle), math.cos(angle)
+        sheet = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+        for i in range(rain_count):
+            seed = i * 10
+            length = random.randint(5, 15)
+            thickness = 1 if random.random() < 0.8 else 2
+            alpha = random.randint(100, 200)
+            x = seed * 97 % width
+            y = seed * 30 % height
+            for shift_x in (0, width):
+                for shift_y in (-height, 0):
+                    start = (x + shift_x, y + shift_y)
+                    pygame.draw.line(sheet, (200, 200, 255, alpha), start,
+                                     (start[0] - sin_angle * length, start[1] + cos_angle * length),
+                                     thickness)
+        return sheet
+
     def render_weather_effect(self, surface):
         """Render weather effects on the screen"""
         if self.weather == Weather.CLEAR:
             return
 
         width, height = surface.get_size()
-        weather_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-
+        weather_surface = self._weather_surface
+        if weather_surface is None or weather_surface.get_size() != (width, height):
+            weather_surface = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+            self._weather_surface = weather_surface
+            self._weather_key = None
+
+        # Clouds and fog only step every few hundred ms, so their layer is
+        # keyed on its inputs and redrawn only when one of them changes
+        layer_key = None
         if self.weather == Weather.CLOUDY:
-            weather_surface.fill((200, 200, 200, 40))
             current_time = pygame.time.get_ticks() // 50  # Slow time factor
-            for i in range(5):
-                cloud_x = (current_time // (10 + i * 5) + i * width // 5) % (width + 200) - 100
-                cloud_y = height // 10 + i * 20
-                cloud_width = 100 + i * 30
-                cloud_height = 40 + i * 10
-                for j in range(5):
-                    offset_x = j * cloud_width // 8
-                    offset_y = math.sin(j * 0.8) * 5
-                    size = cloud_height // 2 + j * 5
-                    pygame.draw.circle(weather_surface, (220, 220, 220, 20),
-                                       (int(cloud_x + offset_x), int(cloud_y + offset_y)), size)
+            cloud_xs = tuple((current_time // (10 + i * 5) + i * width // 5) % (width + 200) - 100
+                             for i in range(len(_CLOUD_PUFFS)))
+            layer_key = (Weather.CLOUDY, cloud_xs)
+        elif self.weather == Weather.FOGGY:
+            layer_key = (Weather.FOGGY, pygame.time.get_ticks() // 100)
+        if layer_key is not None and layer_key == self._weather_key:
+            surface.blit(weather_surface, (0, 0))
+            return
+        self._weather_key = layer_key
+
+        weather_surface.fill(_WEATHER_BASE_COLORS[self.weather])
+
+        if self.weather == Weather.CLOUDY:
+            # Lock once for all the puffs rather than once per circle
+            weather_surface.lock()
+            try:
+                for i, (cloud_x, puffs) in enumerate(zip(cloud_xs, _CLOUD_PUFFS)):
+                    cloud_y = height // 10 + i * 20
+                    for offset_x, offset_y, size in puffs:
+                        pygame.draw.circle(weather_surface, (220, 220, 220, 20),
+                                           (int(cloud_x + offset_x), int(cloud_y + offset_y)), size)
+            finally:
+                weather_surface.unlock()
 
         elif self.weather == Weather.RAINY:
-            weather_surface.fill((100, 100, 150, 60))
             current_time = pygame.time.get_ticks()
-            rain_count = 100
-            for i in range(rain_count):
-                seed = i * 10
-                x = (seed * 97 + current_time // 20) % width
-                y_offset = (current_time // 10 + seed * 13) % height
-                y = (y_offset + seed * 17) % height
-                length = random.randint(5, 15)
-                thickness = 1 if random.random() < 0.8 else 2
-                angle = math.pi / 6  # 30 degrees
-                end_x = x - math.sin(angle) * length
-                end_y = y + math.cos(angle) * length
-                alpha = random.randint(100, 200)
-                pygame.draw.line(weather_surface, (200, 200, 255, alpha),
-                                 (x, y), (end_x, end_y), thickness)
+            rain_sheet = self._rain_sheet
+            if rain_sheet is None or rain_sheet.get_size() != (width, height):
+                rain_sheet = self._rain_sheet = self._create_rain_sheet(width, height)
+            # Scroll the sheet; MAX keeps the drop colors over the base tint
+            x = current_time // 20 % width
+            y = current_time // 10 % height
+            weather_surface.blits([(rain_sheet, pos, None, pygame.BLEND_RGBA_MAX)
+                                   for pos in ((x - width, y - height), (x, y - height),
+                                               (x - width, y), (x, y))], doreturn=False)
 
         elif self.weather == Weather.FOGGY:
-            base_alpha = 100
-            current_time = pygame.time.get_ticks() // 100
-            weather_surface.fill((255, 255, 255, base_alpha))
-            for i in range(8):
-                fog_x = (current_time // (20 + i * 10) + i * 100) % (width * 2) - width // 2
-                fog_y = height // 4 + math.sin(current_time / 1000 + i) * height // 8
-                fog_radius = 100 + i * 30
-                fog_alpha = 20 + int(15 * math.sin(current_time / 500 + i * 0.5))
-                for r in range(fog_radius, 0, -fog_radius // 5):
+            current_time = layer_key[1]
+            # Lock once for all the blobs
+            weather_surface.lock()
+            try:
+                for i in range(8):
+                    fog_x = (current_time // (20 + i * 10) + i * 100) % (width * 2) - width // 2
+                    fog_y = height // 4 + math.sin(current_time / 1000 + i) * height // 8
+                    fog_radius = 100 + i * 30
+                    fog_alpha = 20 + int(15 * math.sin(current_time / 500 + i * 0.5))
+                    # Inner rings share the outer ring's color, so one disc covers them all
                     pygame.draw.circle(weather_surface, (255, 255, 255, fog_alpha),
-                                       (int(fog_x), int(fog_y)), r)
+                                       (int(fog_x), int(fog_y)), fog_radius)
+            finally:
+                weather_surface.unlock()
 
         elif self.weather == Weather.STORMY:
-            weather_surface.fill((50, 50, 70, 100))
             current_time = pygame.time.get_ticks()
             if random.random() < 0.02:  # 2% chance per frame for lightning
                 self.lightning_start = current_time
                 self.lightning_duration = random.randint(50, 150)
-            if hasattr(self, 'lightning_start') and current_time - self.lightning_start < self.lightning_duration:
+            if current_time - self.lightning_start < self.lightning_duration:
                 progress = (current_time - self.lightning_start) / self.lightning_duration
                 intensity = math.sin(progress * math.pi)
                 flash_alpha = int(200 * intensity)
-                flash_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+                flash_surface = self._flash_surface
+                if flash_surface is None or flash_surface.get_size() != (width, height):
+                    flash_surface = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+                    self._flash_surface = flash_surface
                 flash_surface.fill((255, 255, 255, flash_alpha))
                 weather_surface.blit(flash_surface, (0, 0))
                 if random.random() < 0.3 and flash_alpha > 100:
-                    bolt_start_x = random.randint(0, width)
-                    bolt_start_y = 0
-                    bolt_segments = random.randint(4, 8)
-                    bolt_width = 3
-                    last_x, last_y = bolt_start_x, bolt_start_y
-                    for j in range(bolt_segments):
-                        next_x = last_x + random.randint(-80, 80)
-                        next_y = last_y + height // bolt_segments
-                        pygame.draw.line(weather_surface, (200, 200, 255, 240),
-                                         (last_x, last_y), (next_x, next_y), bolt_width)
-                        for k in range(3):
-                            glow_width = bolt_width + k * 2
-                            glow_alpha = 150 - k * 50
-                            pygame.draw.line(weather_surface, (200, 200, 255, glow_alpha),
-                                             (last_x, last_y), (next_x, next_y), glow_width)
-                        if random.random() < 0.3:
-                            fork_x = next_x + random.randint(-40, 40)
-                            fork_y = next_y + random.randint(10, 30)
-                            pygame.draw.line(weather_surface, (200, 200, 255, 200),
-                                             (next_x, next_y), (fork_x, fork_y), bolt_width - 1)
-                        last_x, last_y = next_x, next_y
+                    if self._bolt_templates is None or self._bolt_templates[0][0].get_height() != height:
+                        self._bolt_templates = build_bolt_templates(height)
+                    bolt, anchor_x = random.choice(self._bolt_templates)
+                    weather_surface.blit(bolt, (random.randint(0, width) - anchor_x, 0))
 
         surface.blit(weather_surface, (0, 0))
 
@@ -915,6 +1244,8 @@ class InventoryUI:
         self.is_visible = False
         self.font = pygame.font.SysFont('Arial', FONT_SIZE)
         self.selected_index = 0
+        self._wrapped_description = (None, [])  # (description, wrapped lines)
+        self._background = None
 
     def toggle(self):
         """Toggle inventory visibility"""
@@ -950,10 +1281,11 @@ class InventoryUI:
             INVENTORY_HEIGHT
         )
 
-        # Draw semi-transparent background
-        inventory_surface = pygame.Surface((INVENTORY_WIDTH, INVENTORY_HEIGHT), pygame.SRCALPHA)
-        inventory_surface.fill((0, 0, 0, 200))  # Semi-transparent black
-        surface.blit(inventory_surface, inventory_rect)
+        # Draw semi-transparent background (built once, the panel size is fixed)
+        if self._background is None:
+            self._background = pygame.Surface((INVENTORY_WIDTH, INVENTORY_HEIGHT), pygame.SRCALPHA).convert_alpha()
+            self._background.fill((0, 0, 0, 200))  # Semi-transparent black
+        surface.blit(self._background, inventory_rect)
 
         # Draw border
         pygame.draw.rect(surface, WHITE, inventory_rect, 2)
@@ -1000,8 +1332,11 @@ class InventoryUI:
             pygame.draw.rect(surface, DARK_GRAY, description_rect)
             pygame.draw.rect(surface, LIGHT_GRAY, description_rect, 1)
 
-            # Wrap description text
-            wrapped_text = textwrap.wrap(selected_item.description, width=40)
+            # Wrap description text only when the selection changes
+            description, wrapped_text = self._wrapped_description
+            if description != selected_item.description:
+                wrapped_text = textwrap.wrap(selected_item.description, width=40)
+                self._wrapped_description = (selected_item.description, wrapped_text)
             desc_y = description_rect.y + 5
             for line in wrapped_text:
                 desc_surface = self.font.render(line, True, WHITE)
@@ -1016,16 +1351,33 @@ class InventoryUI:
                           description_rect.y + description_rect.height - self.font.get_height() - 5))
 
 
+# Enum names indexed by value, so the HUD skips the Enum .name descriptor per frame
+_TOD_NAMES = [time_of_day.name for time_of_day in TimeOfDay]
+_WEATHER_NAMES = [weather.name for weather in Weather]
+
+
 class HUD:
     """Heads-up display for game information"""
 
     def __init__(self):
         self.font = pygame.font.SysFont('Arial', FONT_SIZE)
         self.location_font = pygame.font.SysFont('Arial', FONT_SIZE + 4, bold=True)
-
-    def get_average_friendship(self, game_map, player):
+        self._top_bar = None
+        self._top_key = None  # Inputs the cached top bar was drawn from
+        self._bottom_bar = None
+        self._bottom_key = None  # Inputs the cached bottom bar was drawn from
+
+    @staticmethod
+    def _build_bar(width, height):
+        """Create an empty semi-transparent bar in the display format"""
+        bar = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
+        bar.fill((0, 0, 0, 150))
+        return bar
+
+    def get_average_friendship(self, game_map, player, current_room=None):
         """Calculate the average friendship level with NPCs in the current town."""
-        current_room = game_map.get_room_at_position(player.x, player.y)
+        if current_room is None:
+            current_room = game_map.get_room_at_position(player.x, player.y)
         if not current_room:
             return 0
 
@@ -1040,74 +1392,84 @@ class HUD:
     def render(self, surface, player, game_state, game_map):
         """Render HUD elements"""
         width, height = surface.get_size()
+        px, py = player.x, player.y
+        font_height = self.font.get_height()
 
         # Top bar with location, time, and date
         top_bar_height = 40
-        top_bar_rect = pygame.Rect(0, 0, width, top_bar_height)
-        top_bar_surface = pygame.Surface((width, top_bar_height), pygame.SRCALPHA)
-        top_bar_surface.fill((0, 0, 0, 150))
-        surface.blit(top_bar_surface, (0, 0))
 
         # Get current room
-        current_room = game_map.get_room_at_position(player.x, player.y)
+        current_room = game_map.get_room_at_position(px, py)
         location_name = current_room.name if current_room else "Unknown Location"
 
-        # Render location name
-        location_surface = self.location_font.render(location_name, True, WHITE)
-        surface.blit(location_surface, (20, 10))
-
         # Render time and weather
-        time_str = f"Day {game_state.days_passed} - {game_state.time_of_day.name}"
-        weather_str = f"Weather: {game_state.weather.name}"
-
-        time_surface = self.font.render(time_str, True, WHITE)
-        weather_surface = self.font.render(weather_str, True, WHITE)
-
-        # Position at right side of top bar
-        surface.blit(time_surface,
-                     (width - time_surface.get_width() - 20, 5))
-        surface.blit(weather_surface,
-                     (width - weather_surface.get_width() - 20, 5 + self.font.get_height()))
+        time_str = f"Day {game_state.days_passed} - {_TOD_NAMES[game_state.time_of_day.value]}"
+        weather_str = f"Weather: {_WEATHER_NAMES[game_state.weather.value]}"
+
+        # The bars are composed once and only rebuilt when their text changes
+        top_key = (width, location_name, time_str, weather_str)
+        if top_key != self._top_key:
+            self._top_key = top_key
+            self._top_bar = self._build_bar(width, top_bar_height)
+
+            # Render location name
+            location_surface = render_text(self.location_font, location_name, WHITE)
+            self._top_bar.blit(location_surface, (20, 10))
+
+            # Position time and weather at right side of top bar
+            time_surface = render_text(self.font, time_str, WHITE)
+            weather_surface = render_text(self.font, weather_str, WHITE)
+            self._top_bar.blit(time_surface,
+                               (width - time_surface.get_width() - 20, 5))
+            self._top_bar.blit(weather_surface,
+                               (width - weather_surface.get_width() - 20, 5 + font_height))
+        surface.blit(self._top_bar, (0, 0))
 
         # Bottom bar with health and controls hint
         bottom_bar_height = 30
         bottom_bar_y = height - bottom_bar_height
-        bottom_bar_rect = pygame.Rect(0, bottom_bar_y, width, bottom_bar_height)
-        bottom_bar_surface = pygame.Surface((width, bottom_bar_height), pygame.SRCALPHA)
-        bottom_bar_surface.fill((0, 0, 0, 150))
-        surface.blit(bottom_bar_surface, (0, bottom_bar_y))
-
-        # Render health
         health_str = f"Health: {player.health}/100"
-        health_surface = self.font.render(health_str, True, WHITE)
-        surface.blit(health_surface, (20, bottom_bar_y + 5))
-
-        # Render controls hint
-        controls_str = "WASD: Move | E: Interact | I: Inventory | ESC: Menu"
-        controls_surface = self.font.render(controls_str, True, WHITE)
-        surface.blit(controls_surface,
-                     (width - controls_surface.get_width() - 20, bottom_bar_y + 5))
 
-        # Render average friendship in the current town
+        # Average friendship in the current town
+        friendship_str = None
         if current_room:
-            average_friendship = self.get_average_friendship(game_map, player)
+            average_friendship = self.get_average_friendship(game_map, player, current_room)
             friendship_str = f"Avg Friendship: {average_friendship:.1f}/100"
-            friendship_surface = self.font.render(friendship_str, True, WHITE)
-            surface.blit(friendship_surface, (width // 2 - friendship_surface.get_width() // 2, bottom_bar_y + 5))
+
+        bottom_key = (width, health_str, friendship_str)
+        if bottom_key != self._bottom_key:
+            self._bottom_key = bottom_key
+            self._bottom_bar = self._build_bar(width, bottom_bar_height)
+
+            # Render health
+            health_surface = render_text(self.font, health_str, WHITE)
+            self._bottom_bar.blit(health_surface, (20, 5))
+
+            # Render controls hint
+            controls_str = "WASD: Move | E: Interact | I: Inventory | ESC: Menu"
+            controls_surface = render_text(self.font, controls_str, WHITE)
+            self._bottom_bar.blit(controls_surface,
+                                  (width - controls_surface.get_width() - 20, 5))
+
+            if friendship_str:
+                friendship_surface = render_text(self.font, friendship_str, WHITE)
+                self._bottom_bar.blit(friendship_surface,
+                                      (width // 2 - friendship_surface.get_width() // 2, 5))
+        surface.blit(self._bottom_bar, (0, bottom_bar_y))
 
         # Interaction prompt if near an NPC or item
         nearest_npc = game_map.get_npc_near_position(
-            player.x, player.y, INTERACTION_DISTANCE
+            px, py, INTERACTION_DISTANCE
         )
         nearest_items = game_map.get_items_near_position(
-            player.x, player.y, INTERACTION_DISTANCE
+            px, py, INTERACTION_DISTANCE
         )
 
         if nearest_npc:
             # Render friendship status if near an NPC
             friendship_status = nearest_npc.get_friendship_status()
             friendship_str = f"Friendship: {friendship_status} ({nearest_npc.friendship})"
-            friendship_surface = self.font.render(friendship_str, True, WHITE)
+            friendship_surface = render_text(self.font, friendship_str, WHITE)
             surface.blit(friendship_surface, (width - friendship_surface.get_width() - 20, bottom_bar_y - 30))
 
             logger.debug(f"Friendship with {nearest_npc.name}: {nearest_npc.friendship} ({friendship_status})")
@@ -1135,8 +1497,12 @@ class SpriteSheet:
     def image_at(self, rectangle, colorkey=None):
         """Load a specific image from a rectangle"""
         rect = pygame.Rect(rectangle)
-        image = pygame.Surface(rect.size, pygame.SRCALPHA)
-        image.blit(self.sheet, (0, 0), rect)
+        if self.sheet.get_rect().contains(rect):
+            image = self.sheet.subsurface(rect).copy()
+        else:
+            # Rectangles running off the sheet are padded with transparency
+            image = pygame.Surface(rect.size, pygame.SRCALPHA)
+            image.blit(self.sheet, (0, 0), rect)
 
         if colorkey is not None:
             if colorkey == -1:
@@ -1151,29 +1517,87 @@ class SpriteSheet:
 
     def load_strip(self, rect, image_count, colorkey=None):
         """Load a strip of images and return them as a list"""
-        tups = [(rect[0] + rect[2] * x, rect[1], rect[2], rect[3])
-                for x in range(image_count)]
-        return self.images_at(tups, colorkey)
+        rects = [pygame.Rect(rect[0] + rect[2] * x, rect[1], rect[2], rect[3])
+                 for x in range(image_count)]
+        return self.images_at(rects, colorkey)
+
+
+# NPC generation tables, built once at import rather than on every NPC
+_OCCUPATIONS = {
+    "friendly": ["Merchant", "Innkeeper", "Town Crier"],
+    "mysterious": ["Fortune Teller", "Spy", "Wandering Sage"],
+    "wise": ["Scholar", "Elder", "Advisor"],
+    "busy": ["Blacksmith", "Farmer", "Trader"],
+    "default": ["Villager", "Traveler"]
+}
+
+_POSSIBLE_SKILLS = (
+    "Persuasion", "Crafting", "Hunting", "Cooking",
+    "Herbalism", "Smithing", "Navigation", "Diplomacy",
+    "Storytelling", "Trading", "Farming"
+)
+
+_TRADE_SKILLS = (
+    "Bargaining", "Price Estimation",
+    "Item Appraisal", "Market Knowledge"
+)
+
+# (name, min price, max price)
+_TRADE_ITEMS = (
+    ("Health Potion", 5, 50),
+    ("Map Fragment", 10, 100),
+    ("Mysterious Herb", 15, 75),
+    ("Crafting Material", 5, 30),
+    ("Local Artifact", 50, 200)
+)
+
+# (name, description, min reward, max reward)
+_QUEST_TYPES = (
+    ("Deliver Message", "Deliver a message to another NPC in the village", 10, 50),
+    ("Gather Herbs", "Collect specific herbs from the nearby forest", 15, 75),
+    ("Protect Traveler", "Escort a traveler through dangerous terrain", 25, 100)
+)
 
 
 def _generate_trade_skills():
     """Generate trade-specific skills"""
-    trade_skills = [
-        "Bargaining", "Price Estimation",
-        "Item Appraisal", "Market Knowledge"
-    ]
+    return {skill: random.randint(1, 10) for skill in _TRADE_SKILLS}
+
+
+class NPCAction(IntEnum):
+    """Idle behaviors an NPC cycles through; values index NPC._ACTION_HANDLERS"""
+    IDLE = 0
+    WANDER = 1
+    PATROL = 2
 
-    return {skill: random.randint(1, 10) for skill in trade_skills}
+
+_NPC_ACTIONS = tuple(NPCAction)
+# Every (dx, dy) wander step, so one random pick replaces one per axis
+_WANDER_STEPS = tuple((dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
 
 
 class NPC(MovingEntity):
+    # Sprite sets shared by every NPC built from the same inputs. Frames are
+    # only ever read, so one set of surfaces serves all NPCs that look alike.
+    _SPRITE_CACHE = {}
+    _floating_font = None  # Shared floating text font, created on first use
+
+    # NPC-to-NPC interaction state, managed by NPCInteractionManager
+    is_interacting = False
+    interaction_partner = None
+    interaction_message = None
+    message_time = 0
+
+    # (npc x, npc y, player x, player y) at the last follow step, managed by NPCFollowerSystem
+    _follow_positions = None
+
     def __init__(self, entity_id, name, x, y, personality, backstory, location_id, items=None, color=YELLOW):
         super().__init__(entity_id, name, x, y, TILE_SIZE, TILE_SIZE, color=color, entity_type=EntityType.NPC)
 
         # Enhanced NPC attributes
         self.personality = personality
         self.backstory = backstory
-        self.location_id = location_id
+        self.location_id = sys.intern(location_id)
         self.items = items or []
 
         # Add friendship meter
@@ -1205,7 +1629,7 @@ class NPC(MovingEntity):
             "friendliness": random.uniform(0, 1),  # 0 to 1 scale
             "trust": random.uniform(0, 1),
             "known_players": [],  # Track player interactions
-            "relationship_history": []  # Log of interactions
+            "relationship_history": deque(maxlen=10)  # Log of the most recent interactions
         }
 
         # Quest and mission related
@@ -1252,8 +1676,9 @@ class NPC(MovingEntity):
             return
 
         # Calculate position above NPC's head
-        text_font = pygame.font.SysFont('Arial', 16)
-        text_surface = text_font.render(self.floating_text, True, WHITE)
+        if NPC._floating_font is None:
+            NPC._floating_font = pygame.font.SysFont('Arial', 16)
+        text_surface = render_text(NPC._floating_font, self.floating_text, WHITE)
 
         # Position text centered above NPC
         text_x = self.x - camera_x + (self.width - text_surface.get_width()) // 2
@@ -1289,68 +1714,30 @@ class NPC(MovingEntity):
 
     def _generate_occupation(self):
         """Generate a random occupation based on personality"""
-        occupations = {
-            "friendly": ["Merchant", "Innkeeper", "Town Crier"],
-            "mysterious": ["Fortune Teller", "Spy", "Wandering Sage"],
-            "wise": ["Scholar", "Elder", "Advisor"],
-            "busy": ["Blacksmith", "Farmer", "Trader"],
-            "default": ["Villager", "Traveler"]
-        }
-
         # Find matching occupations or use default
         personality_types = self.personality.split(',')
         for p in personality_types:
-            if p in occupations:
-                return random.choice(occupations[p])
+            if p in _OCCUPATIONS:
+                return random.choice(_OCCUPATIONS[p])
 
-        return random.choice(occupations["default"])
+        return random.choice(_OCCUPATIONS["default"])
 
     def _generate_skills(self):
         """Generate a set of skills for the NPC"""
-        possible_skills = [
-            "Persuasion", "Crafting", "Hunting", "Cooking",
-            "Herbalism", "Smithing", "Navigation", "Diplomacy",
-            "Storytelling", "Trading", "Farming"
-        ]
-
         # Generate 2-4 random skills
         num_skills = random.randint(2, 4)
-        return {skill: random.randint(1, 10) for skill in random.sample(possible_skills, num_skills)}
+        return {skill: random.randint(1, 10) for skill in random.sample(_POSSIBLE_SKILLS, num_skills)}
 
     def _generate_trade_inventory(self):
         """Generate a trade inventory with potential items"""
-        trade_items = [
-            {"name": "Health Potion", "price": random.randint(5, 50)},
-            {"name": "Map Fragment", "price": random.randint(10, 100)},
-            {"name": "Mysterious Herb", "price": random.randint(15, 75)},
-            {"name": "Crafting Material", "price": random.randint(5, 30)},
-            {"name": "Local Artifact", "price": random.randint(50, 200)}
-        ]
-
-        # Generate 2-5 trade items
-        return random.sample(trade_items, random.randint(2, 5))
+        # Generate 2-5 trade items, pricing only the ones picked
+        return [{"name": name, "price": random.randint(low, high)}
+                for name, low, high in random.sample(_TRADE_ITEMS, random.randint(2, 5))]
 
     def _generate_quests(self):
         """Generate potential quests for the NPC"""
-        quest_types = [
-            {
-                "name": "Deliver Message",
-                "description": "Deliver a message to another NPC in the village",
-                "reward": random.randint(10, 50)
-            },
-            {
-                "name": "Gather Herbs",
-                "description": "Collect specific herbs from the nearby forest",
-                "reward": random.randint(15, 75)
-            },
-            {
-                "name": "Protect Traveler",
-                "description": "Escort a traveler through dangerous terrain",
-                "reward": random.randint(25, 100)
-            }
-        ]
-
-        return random.sample(quest_types, random.randint(1, 3))
+        return [{"name": name, "description": description, "reward": random.randint(low, high)}
+                for name, description, low, high in random.sample(_QUEST_TYPES, random.randint(1, 3))]
 
     def update_relationship(self, player, interaction_type):
         """Update relationship based on player interactions"""
@@ -1384,36 +1771,25 @@ class NPC(MovingEntity):
         if player not in self.relationships["known_players"]:
             self.relationships["known_players"].append(player)
 
-    def get_current_sprite(self):
+    def get_current_sprite(self, now_ms=None):
         """Get the current sprite based on direction and animation frame"""
+        if now_ms is None:
+            now_ms = pygame.time.get_ticks()
+
         if not hasattr(self, 'sprites'):
             # Create basic sprites if not already created
-            self.sprites = {
-                Direction.DOWN: [pygame.Surface((self.width, self.height), pygame.SRCALPHA) for _ in range(4)],
-                Direction.LEFT: [pygame.Surface((self.width, self.height), pygame.SRCALPHA) for _ in range(4)],
-                Direction.RIGHT: [pygame.Surface((self.width, self.height), pygame.SRCALPHA) for _ in range(4)],
-                Direction.UP: [pygame.Surface((self.width, self.height), pygame.SRCALPHA) for _ in range(4)]
-            }
-
-            # Create basic NPC appearance
-            for direction, frames in self.sprites.items():
-                for i, frame in enumerate(frames):
-                    pygame.draw.rect(frame, self.color, (0, 0, self.width, self.height))
-                    # Add some variation based on frame
-                    variation = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-                    alpha = 50 + i * 20
-                    variation.fill((0, 0, 0, alpha))
-                    frame.blit(variation, (0, 0))
+            self.sprites = NPC._get_color_sprites(self.color, self.width, self.height)
+            self._frames_by_dir = _frames_by_direction(self.sprites)
 
         # Update animation frame if moving
         if not hasattr(self, 'animation_frame'):
             self.animation_frame = 0
 
         if not hasattr(self, 'last_frame_change'):
-            self.last_frame_change = pygame.time.get_ticks()
+            self.last_frame_change = now_ms
             self.frame_delay = 200  # milliseconds
 
-        current_time = pygame.time.get_ticks()
+        current_time = now_ms
         if self.is_moving:
             if current_time - self.last_frame_change > self.frame_delay:
                 self.animation_frame = (self.animation_frame + 1) % 4
@@ -1426,13 +1802,75 @@ class NPC(MovingEntity):
         if not hasattr(self, 'direction'):
             self.direction = Direction.DOWN
 
-        return self.sprites[self.direction][self.animation_frame]
+        return self._frames_by_dir[self.direction.value][self.animation_frame]
+
+    @classmethod
+    def _get_color_sprites(cls, color, width, height):
+        """Get the shared plain-colored sprite set for a color and size"""
+        key = ("color", color, width, height)
+        sprites = cls._SPRITE_CACHE.get(key)
+        if sprites is None:
+            # All 16 frames live on one atlas (a row per direction, a column per
+            # frame); each frame is a subsurface view into it
+            directions = (Direction.DOWN, Direction.LEFT, Direction.RIGHT, Direction.UP)
+            atlas = pygame.Surface((width * 4, height * len(directions)))
+            sprites = {}
+
+            # Create basic NPC appearance; each frame's darker shade is baked
+            # into the fill color so the frames stay opaque
+            for i in range(4):
+                shade = 1 - (50 + i * 20) / 255
+                frame_color = tuple(int(c * shade) for c in color[:3])
+                for row in range(len(directions)):
+                    atlas.fill(frame_color, (i * width, row * height, width, height))
+
+            # Match the display format once so frame blits skip per-pixel conversion
+            atlas = atlas.convert()
+            for row, direction in enumerate(directions):
+                sprites[direction] = [atlas.subsurface((i * width, row * height, width, height))
+                                      for i in range(4)]
+
+            cls._SPRITE_CACHE[key] = sprites
+        return sprites
 
-    def simulate_npc_response(self, environment_state, player_message):
+    @classmethod
+    def _get_shadow(cls, width, height):
+        """Get the shared ground shadow for an NPC of this size"""
+        key = ("shadow", width, height)
+        shadow = cls._SPRITE_CACHE.get(key)
+        if shadow is None:
+            # Solid ellipse on a color-keyed background, matching draw.ellipse
+            # onto the (alpha-less) display surface
+            shadow = pygame.Surface((width - 8, height // 3))
+            shadow.fill((255, 0, 255))
+            pygame.draw.ellipse(shadow, (0, 0, 0), shadow.get_rect())
+            shadow.set_colorkey((255, 0, 255))
+            shadow = cls._SPRITE_CACHE[key] = shadow.convert()
+        return shadow
+
+    def get_current_frame(self, now_ms=None):
+        """
+        Get the current sprite as a (source surface, area) pair for blitting.
+
+        Frames cut from a shared atlas return the atlas and the frame's rect,
+        so every NPC with that look draws from the same source surface.
+        """
+        sprite = self.get_current_sprite(now_ms)
+        atlas = sprite.get_parent()
+        if atlas is None:
+            return sprite, None
+        return atlas, pygame.Rect(sprite.get_offset(), sprite.get_size())
+
+    def get_blit_tuple(self, camera_x, camera_y, now_ms=None):
+        """Get a (source, dest, area) entry for Surface.blits"""
+        source, area = self.get_current_frame(now_ms)
+        return source, (self.x - camera_x, self.y - camera_y), area
+
+    def simulate_npc_response(self, environment_state, player_message, raise_errors=False):
         """Wrapper method to use the global simulate_npc_response function"""
-        return simulate_npc_response(self, environment_state, player_message)
+        return simulate_npc_response(self, environment_state, player_message, raise_errors)
 
-    def update(self, game_map, game_state, player):
+    def update(self, game_map, game_state, player, now_ms=None):
         """
         Update NPC state, movement, and interactions
 
@@ -1440,10 +1878,27 @@ class NPC(MovingEntity):
             game_map (GameMap): Current game map
             game_state (GameState): Current game state
             player (Player): Player character
+            now_ms (int, optional): Frame time in milliseconds, read from pygame if omitted
         """
         # Basic movement and action logic
-        current_time = pygame.time.get_ticks()
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
+        self._tick_timers(current_time)
+
+        # Perform current action
+        self._ACTION_HANDLERS[self.current_action](self, game_map)
+
+    def update_offscreen(self, now_ms=None):
+        """
+        Cheap update for NPCs outside the camera view: advance the floating
+        text and action timers, but skip movement and animation.
 
+        Args:
+            now_ms (int, optional): Frame time in milliseconds, read from pygame if omitted
+        """
+        self._tick_timers(now_ms if now_ms is not None else pygame.time.get_ticks())
+
+    def _tick_timers(self, current_time):
+        """Expire floating text and pick a new action when the current one runs out"""
         # Update floating text if it exists
         if hasattr(self, 'floating_text') and self.floating_text:
             if current_time - self.floating_text_timer > self.floating_text_duration:
@@ -1453,53 +1908,56 @@ class NPC(MovingEntity):
         # Implement basic NPC behavior
         if not hasattr(self, 'last_action_time'):
             self.last_action_time = current_time
-            self.current_action = "idle"
+            self.current_action = NPCAction.IDLE
             self.action_duration = random.randint(2000, 5000)  # 2-5 seconds
 
         # Change action periodically
         if current_time - self.last_action_time > self.action_duration:
             # Randomly choose next action
-            actions = ["idle", "wander", "patrol"]
-            self.current_action = random.choice(actions)
+            self.current_action = random.choice(_NPC_ACTIONS)
             self.last_action_time = current_time
             self.action_duration = random.randint(2000, 5000)
 
-        # Perform current action
-        if self.current_action == "idle":
-            # Do nothing
-            pass
-        elif self.current_action == "wander":
-            # Random movement
-            dx = random.choice([-1, 0, 1]) * self.speed
-            dy = random.choice([-1, 0, 1]) * self.speed
+    def _act_idle(self, game_map):
+        """Idle action: do nothing"""
+        pass
+
+    def _act_wander(self, game_map):
+        """Wander action: random movement"""
+        dx, dy = random.choice(_WANDER_STEPS)
+        self.move(dx * self.speed, dy * self.speed, game_map)
+
+    def _act_patrol(self, game_map):
+        """Patrol action: walk towards a random point in the NPC's room"""
+        if not hasattr(self, 'patrol_target'):
+            # Set initial patrol target within room
+            bounds = game_map.get_room_bounds(self.location_id)
+            if bounds:
+                x_min, x_max, y_min, y_max = bounds
+                self.patrol_target = (
+                    random.randint(x_min, x_max),
+                    random.randint(y_min, y_max)
+                )
+
+        # Move towards patrol target
+        if hasattr(self, 'patrol_target'):
+            dx = self.patrol_target[0] - self.x
+            dy = self.patrol_target[1] - self.y
+
+            # Normalize movement
+            distance = max(1, math.sqrt(dx * dx + dy * dy))
+            dx = int(dx / distance * self.speed)
+            dy = int(dy / distance * self.speed)
+
             self.move(dx, dy, game_map)
-        elif self.current_action == "patrol":
-            # Simple patrolling behavior
-            if not hasattr(self, 'patrol_target'):
-                # Set initial patrol target within room
-                room = game_map.get_room_by_id(self.location_id)
-                if room:
-                    self.patrol_target = (
-                        random.randint(room.x, room.x + room.width),
-                        random.randint(room.y, room.y + room.height)
-                    )
-
-            # Move towards patrol target
-            if hasattr(self, 'patrol_target'):
-                dx = self.patrol_target[0] - self.x
-                dy = self.patrol_target[1] - self.y
-
-                # Normalize movement
-                distance = max(1, math.sqrt(dx * dx + dy * dy))
-                dx = int(dx / distance * self.speed)
-                dy = int(dy / distance * self.speed)
-
-                self.move(dx, dy, game_map)
-
-                # Check if reached target
-                if abs(self.x - self.patrol_target[0]) < self.speed and \
-                        abs(self.y - self.patrol_target[1]) < self.speed:
-                    delattr(self, 'patrol_target')
+
+            # Check if reached target
+            if abs(self.x - self.patrol_target[0]) < self.speed and \
+                    abs(self.y - self.patrol_target[1]) < self.speed:
+                delattr(self, 'patrol_target')
+
+    # Indexed by NPCAction value
+    _ACTION_HANDLERS = (_act_idle, _act_wander, _act_patrol)
 
     def update_friendship(self, amount):
         """Update the friendship meter by a certain amount."""
@@ -1520,7 +1978,6 @@ class NPC(MovingEntity):
     def load_sprites(self):
         """Load NPC sprites based on personality using SpriteManager"""
         try:
-            self.sprite_manager = SpriteManager()
             if "merchant" in self.personality.lower():
                 sprite_file = 'npc_merchant.png'
             elif "elder" in self.personality.lower():
@@ -1528,6 +1985,14 @@ class NPC(MovingEntity):
             else:
                 sprite_file = 'npc_generic.png'
 
+            # Reuse the frames if another NPC already built this sprite set
+            cache_key = ("file", sprite_file, self.width, self.height)
+            if cache_key in NPC._SPRITE_CACHE:
+                self.sprites = NPC._SPRITE_CACHE[cache_key]
+                self._frames_by_dir = _frames_by_direction(self.sprites)
+                return
+
+            self.sprite_manager = SpriteManager()
             sprite_path = os.path.join('npc', sprite_file)
             self.sprites = {
                 Direction.DOWN: [],
@@ -1543,8 +2008,9 @@ class NPC(MovingEntity):
                     frame.blit(sprite, (0, 0))
                     # Add simple animation (e.g., offset or color variation)
                     pygame.draw.rect(frame, (255, 255, 255, 50 * (i + 1)), (0, 0, self.width, self.height), 1)
-                    frames.append(frame)
+                    frames.append(frame.convert_alpha())
                 self.sprites[direction] = frames
+            NPC._SPRITE_CACHE[cache_key] = self.sprites
         except Exception as e:
             logger.error(f"Failed to load NPC sprites for {self.name}: {e}")
             # Create basic colored sprites
@@ -1557,6 +2023,7 @@ class NPC(MovingEntity):
             for direction in self.sprites:
                 for frame in self.sprites[direction]:
                     frame.fill(self.color)
+        self._frames_by_dir = _frames_by_direction(self.sprites)
 
     # Add this to the NPC class
     def move(self, dx: int, dy: int, game_map) -> bool:
@@ -1569,10 +2036,7 @@ class NPC(MovingEntity):
         new_y = self.y + dy
 
         # Update direction based on movement
-        if abs(dx) > abs(dy):
-            self.direction = Direction.RIGHT if dx > 0 else Direction.LEFT
-        else:
-            self.direction = Direction.DOWN if dy > 0 else Direction.UP
+        self.direction = _direction_for(dx, dy)
 
         # Check boundary collisions
         if new_x < 0 or new_x > game_map.width - self.width or new_y < 0 or new_y > game_map.height - self.height:
@@ -1580,14 +2044,14 @@ class NPC(MovingEntity):
 
         # Check collision with obstacles
         temp_rect = pygame.Rect(new_x, new_y, self.width, self.height)
-        for obstacle in game_map.obstacles:
-            if temp_rect.colliderect(obstacle.get_rect()):
-                return False
+        if temp_rect.collidelist(game_map._obstacle_rects) != -1:
+            return False
 
         # Move if no collision
         self.x = new_x
         self.y = new_y
         self.is_moving = True
+        game_map.update_npc_cell(self)
         return True
 
 
@@ -1902,6 +2366,7 @@ class NPCFollowerSystem:
         npc.follow_start_time = current_time
         npc.follow_state = NPCFollowState.FOLLOWING
         npc.following_player = player
+        npc._follow_positions = None
         # Use the game_map from the Game instance instead of the player
         npc.game_map = npc.game_map  # NPC already has game_map reference
 
@@ -1914,6 +2379,13 @@ class NPCFollowerSystem:
             print(f"Missing target or game_map for NPC {npc.name}")  # Debug print
             return
 
+        # Obstacles never move, so if neither the follower nor the player has
+        # moved since the last step, that step's outcome still holds
+        positions = (npc.x, npc.y, target.x, target.y)
+        if positions == npc._follow_positions:
+            return
+        npc._follow_positions = positions
+
         dx = target.x - npc.x
         dy = target.y - npc.y
         distance = math.sqrt(dx * dx + dy * dy)
@@ -1953,6 +2425,7 @@ class NPCFollowerSystem:
         npc.departure_reason = reason
         npc.set_floating_text(reason, 5000)
         npc.following_player = None
+        npc._follow_positions = None
 
 
 # Add these commands to your dialogue or interaction system
@@ -2036,10 +2509,10 @@ class Wizard(MovingEntity):
         self.animation_speed = 0.2
         self.last_update = pygame.time.get_ticks()
 
-    def update(self, game_map, game_state, player):
-        super().update(game_map, game_state, player)
+    def update(self, game_map, game_state, player, now_ms=None):
+        super().update(game_map, game_state, player, now_ms)
 
-        now = pygame.time.get_ticks()
+        now = now_ms if now_ms is not None else pygame.time.get_ticks()
         if now - self.last_update > self.animation_speed * 1000:
             self.animation_frame = (self.animation_frame + 1) % len(self.sprites[self.current_animation])
             self.last_update = now
@@ -2089,7 +2562,8 @@ class Player(MovingEntity):
         # Visual effects
         self.light_radius = 150
         self.shadow_offset = 4
-        self.footstep_particles = []
+        self._shadow_surface = self._build_shadow_surface()
+        self.footstep_particles = FootstepParticles()
         self.particle_timer = 0
         self.particle_delay = 200  # ms between particle emissions
 
@@ -2113,11 +2587,12 @@ class Player(MovingEntity):
                     frame.blit(sprite, (0, 0))
                     # Add simple animation (e.g., offset or color variation)
                     pygame.draw.rect(frame, (255, 255, 255, 50 * (i + 1)), (0, 0, self.width, self.height), 1)
-                    frames.append(frame)
+                    frames.append(frame.convert_alpha())
                 self.sprites[direction] = frames
         except Exception as e:
             logger.error(f"Error loading player sprites: {e}")
             self._create_fallback_sprites()
+        self._frames_by_dir = _frames_by_direction(self.sprites)
 
     def _create_fallback_sprites(self):
         """Create basic colored sprites if image loading fails"""
@@ -2178,13 +2653,17 @@ class Player(MovingEntity):
                 highlight.fill((255, 255, 255, 30))
                 frame.blit(highlight, (self.width // 4, self.height // 4))
 
-    def get_current_sprite(self):
+        # Convert to the display format once so every blit skips pixel conversion
+        for direction, frames in self.sprites.items():
+            self.sprites[direction] = [frame.convert_alpha() for frame in frames]
+
+    def get_current_sprite(self, now_ms=None):
         """Get the current sprite based on direction and animation frame"""
         if not self.sprites:
             self.load_sprites()
 
         # Update animation frame if moving
-        current_time = pygame.time.get_ticks()
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
         if self.is_moving:
             if current_time - self.last_frame_change > self.frame_delay:
                 self.animation_frame = (self.animation_frame + 1) % 4
@@ -2193,14 +2672,14 @@ class Player(MovingEntity):
             # Use standing frame (first frame) when not moving
             self.animation_frame = 0
 
-        return self.sprites[self.direction][self.animation_frame]
+        return self._frames_by_dir[self.direction.value][self.animation_frame]
 
-    def add_footstep_particle(self, game_state):
+    def add_footstep_particle(self, game_state, now_ms=None):
         """Add a footstep particle effect"""
         if not self.is_moving:
             return
 
-        current_time = pygame.time.get_ticks()
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
         if current_time - self.particle_timer < self.particle_delay:
             return
 
@@ -2229,76 +2708,41 @@ class Player(MovingEntity):
             size = random.randint(2, 4)
             lifetime = random.randint(200, 400)
 
-        particle = {
-            'x': self.x + self.width // 2 + offset_x,
-            'y': self.y + self.height - 2,
-            'size': size,
-            'color': color,
-            'life': lifetime,
-            'created': current_time
-        }
+        self.footstep_particles.add(self.x + self.width // 2 + offset_x,
+                                    self.y + self.height - 2,
+                                    size, color, lifetime, current_time)
 
-        self.footstep_particles.append(particle)
-
-    def update_particles(self):
+    def update_particles(self, now_ms=None):
         """Update and expire particles"""
-        current_time = pygame.time.get_ticks()
-        self.footstep_particles = [p for p in self.footstep_particles
-                                   if current_time - p['created'] < p['life']]
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
+        self.footstep_particles.expire(current_time)
 
-    def render_particles(self, surface, camera_x, camera_y):
+    def render_particles(self, surface, camera_x, camera_y, now_ms=None):
         """Render footstep particles"""
-        for particle in self.footstep_particles:
-            # Calculate remaining life percentage
-            current_time = pygame.time.get_ticks()
-            life_pct = 1.0 - ((current_time - particle['created']) / particle['life'])
-
-            # Adjust alpha based on remaining life
-            color = list(particle['color'])
-            if len(color) > 3:
-                color[3] = int(color[3] * life_pct)
-
-            # Draw particle
-            pos_x = particle['x'] - camera_x
-            pos_y = particle['y'] - camera_y
-            size = particle['size'] * life_pct
-
-            if size > 0.5:  # Only draw if big enough
-                if len(color) > 3:
-                    # Use gfxdraw for anti-aliased circle with alpha
-                    gfxdraw.filled_circle(surface,
-                                          int(pos_x), int(pos_y),
-                                          int(size), tuple(color))
-                else:
-                    # Fallback to regular circle
-                    pygame.draw.circle(surface, tuple(color),
-                                       (int(pos_x), int(pos_y)), int(size))
-
-    def render_shadow(self, surface, camera_x, camera_y):
-        """Render a shadow beneath the player"""
-        shadow_x = self.x - camera_x + self.shadow_offset
-        shadow_y = self.y - camera_y + self.height - 4
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
+        self.footstep_particles.render(surface, camera_x, camera_y, current_time)
 
+    def _build_shadow_surface(self):
+        """Draw the semi-transparent ellipse shadow once; only its position changes"""
         # Create elongated ellipse shadow
         shadow_width = self.width - 8
         shadow_height = self.height // 3
 
-        shadow_rect = pygame.Rect(
-            shadow_x - shadow_width // 2 + self.width // 2,
-            shadow_y,
-            shadow_width,
-            shadow_height
-        )
-
-        # Draw semi-transparent shadow
         shadow_surface = pygame.Surface((shadow_width, shadow_height), pygame.SRCALPHA)
         shadow_surface.fill((0, 0, 0, 0))
         gfxdraw.filled_ellipse(shadow_surface,
                                shadow_width // 2, shadow_height // 2,
                                shadow_width // 2, shadow_height // 2,
                                (0, 0, 0, 80))
+        return shadow_surface.convert_alpha()
+
+    def render_shadow(self, surface, camera_x, camera_y):
+        """Render a shadow beneath the player"""
+        shadow_x = self.x - camera_x + self.shadow_offset
+        shadow_y = self.y - camera_y + self.height - 4
 
-        surface.blit(shadow_surface, shadow_rect)
+        surface.blit(self._shadow_surface,
+                     (shadow_x - self._shadow_surface.get_width() // 2 + self.width // 2, shadow_y))
 
     def handle_input(self, keys, game_map):
         """Handle keyboard input for player movement with diagonal movement"""
@@ -2397,7 +2841,8 @@ class EnhancedPlayer(MovingEntity):
         # Visual effects (optional, for enhancement)
         self.light_radius = 150
         self.shadow_offset = 4
-        self.footstep_particles = []
+        self._shadow_surface = self._build_shadow_surface()
+        self.footstep_particles = FootstepParticles()
         self.particle_timer = 0
         self.particle_delay = 150  # ms between particle emissions
         self.trail_effect = []  # Movement trail effect
@@ -2478,8 +2923,9 @@ class EnhancedPlayer(MovingEntity):
         except Exception as e:
             logger.error(f"Error loading adventurer sprites: {e}")
             self._create_fallback_sprites()
+        self._frames_by_dir = _frames_by_direction(self.sprites)
 
-    def get_current_sprite(self):
+    def get_current_sprite(self, now_ms=None):
         """Get the current sprite based on movement state with consistent sizing"""
         if not self.sprites:
             self.load_sprites()
@@ -2495,12 +2941,12 @@ class EnhancedPlayer(MovingEntity):
             delay = self.frame_delay_run  # Use run-specific delay
 
         # Update animation frame
-        current_time = pygame.time.get_ticks()
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
         if current_time - self.last_frame_change > delay:
             self.animation_frame = (self.animation_frame + 1) % frame_count
             self.last_frame_change = current_time
 
-        frame = self.sprites[self.direction][anim_offset + self.animation_frame]
+        frame = self._frames_by_dir[self.direction.value][anim_offset + self.animation_frame]
         # Ensure frame size matches target size to prevent warping
         if frame.get_width() != self.width or frame.get_height() != self.height:
             frame = pygame.transform.scale(frame, (self.width, self.height))
@@ -2528,12 +2974,12 @@ class EnhancedPlayer(MovingEntity):
             # Draw trail sprite
             surface.blit(trail_sprite, (x - camera_x, y - camera_y))
 
-    def add_footstep_particle(self, game_state):
+    def add_footstep_particle(self, game_state, now_ms=None):
         """Add a footstep particle effect"""
         if not self.is_moving:
             return
 
-        current_time = pygame.time.get_ticks()
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
         if current_time - self.particle_timer < self.particle_delay:
             return
 
@@ -2562,79 +3008,51 @@ class EnhancedPlayer(MovingEntity):
             size = random.randint(2, 4)
             lifetime = random.randint(200, 400)
 
-        particle = {
-            'x': self.x + self.width // 2 + offset_x,
-            'y': self.y + self.height - 2,
-            'size': size,
-            'color': color,
-            'life': lifetime,
-            'created': current_time
-        }
-
-        self.footstep_particles.append(particle)
+        self.footstep_particles.add(self.x + self.width // 2 + offset_x,
+                                    self.y + self.height - 2,
+                                    size, color, lifetime, current_time)
 
-    def update_particles(self):
+    def update_particles(self, now_ms=None):
         """Update and expire particles"""
-        current_time = pygame.time.get_ticks()
-        self.footstep_particles = [p for p in self.footstep_particles
-                                   if current_time - p['created'] < p['life']]
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
+        self.footstep_particles.expire(current_time)
 
-    def render_particles(self, surface, camera_x, camera_y):
+    def render_particles(self, surface, camera_x, camera_y, now_ms=None):
         """Render footstep particles"""
-        for particle in self.footstep_particles:
-            # Calculate remaining life percentage
-            current_time = pygame.time.get_ticks()
-            life_pct = 1.0 - ((current_time - particle['created']) / particle['life'])
-
-            # Adjust alpha based on remaining life
-            color = list(particle['color'])
-            if len(color) > 3:
-                color[3] = int(color[3] * life_pct)
-
-            # Draw particle
-            pos_x = particle['x'] - camera_x
-            pos_y = particle['y'] - camera_y
-            size = particle['size'] * life_pct
-
-            if size > 0.5:  # Only draw if big enough
-                if len(color) > 3:
-                    # Use gfxdraw for anti-aliased circle with alpha
-                    gfxdraw.filled_circle(surface,
-                                          int(pos_x), int(pos_y),
-                                          int(size), tuple(color))
-                else:
-                    # Fallback to regular circle
-                    pygame.draw.circle(surface, tuple(color),
-                                       (int(pos_x), int(pos_y)), int(size))
-
-    def render_shadow(self, surface, camera_x, camera_y):
-        """Render a shadow beneath the player"""
-        shadow_x = self.x - camera_x + self.shadow_offset
-        shadow_y = self.y - camera_y + self.height - 4
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
+        self.footstep_particles.render(surface, camera_x, camera_y, current_time)
 
+    def _build_shadow_surface(self):
+        """Draw the semi-transparent ellipse shadow once; only its position changes"""
         # Create elongated ellipse shadow
         shadow_width = self.width - 8
         shadow_height = self.height // 3
 
-        shadow_rect = pygame.Rect(
-            shadow_x - shadow_width // 2 + self.width // 2,
-            shadow_y,
-            shadow_width,
-            shadow_height
-        )
-
-        # Draw semi-transparent shadow
         shadow_surface = pygame.Surface((shadow_width, shadow_height), pygame.SRCALPHA)
         shadow_surface.fill((0, 0, 0, 0))
         gfxdraw.filled_ellipse(shadow_surface,
                                shadow_width // 2, shadow_height // 2,
                                shadow_width // 2, shadow_height // 2,
                                (0, 0, 0, 80))
+        return shadow_surface.convert_alpha()
 
-        surface.blit(shadow_surface, shadow_rect)
+    def render_shadow(self, surface, camera_x, camera_y):
+        """Render a shadow beneath the player"""
+        shadow_x = self.x - camera_x + self.shadow_offset
+        shadow_y = self.y - camera_y + self.height - 4
+
+        surface.blit(self._shadow_surface,
+                     (shadow_x - self._shadow_surface.get_width() // 2 + self.width // 2, shadow_y))
 
     def handle_input(self, keys, game_map, events):
-        """Handle keyboard input with improved physics-based movement"""
+        """
+        Handle keyboard input with improved physics-based movement
+
+        Args:
+            keys (set): Key codes currently held down
+            game_map (GameMap): Current game map
+            events (list): Events for this frame
+        """
         # If in dialogue, set to idle
         if self.game_instance.dialogue_manager.is_active:
             self.is_moving = False
@@ -2658,28 +3076,18 @@ class EnhancedPlayer(MovingEntity):
                     if event.button == 1:  # Left mouse button
                         self.inventory.end_drag(pygame.mouse.get_pos())
 
-        # Reset acceleration
-        accel_x, accel_y = 0, 0
-        self.is_moving = False
+        # Fold the held movement keys into one mask and resolve it with a single lookup
+        mask = 0
+        for key in keys:
+            mask |= _MOVE_KEY_BITS.get(key, 0)
+        sign_x, sign_y, facing = _MOVE_BY_MASK[mask]
 
         # Determine acceleration based on input
-        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-            accel_x = -self.acceleration
-            self.direction = Direction.LEFT
-            self.is_moving = True
-        elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-            accel_x = self.acceleration
-            self.direction = Direction.RIGHT
-            self.is_moving = True
-
-        if keys[pygame.K_UP] or keys[pygame.K_w]:
-            accel_y = -self.acceleration
-            self.direction = Direction.UP
-            self.is_moving = True
-        elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-            accel_y = self.acceleration
-            self.direction = Direction.DOWN
-            self.is_moving = True
+        accel_x = sign_x * self.acceleration
+        accel_y = sign_y * self.acceleration
+        self.is_moving = facing is not None
+        if self.is_moving:
+            self.direction = facing
 
         # Fix diagonal movement speed
         if accel_x != 0 and accel_y != 0:
@@ -2694,10 +3102,10 @@ class EnhancedPlayer(MovingEntity):
         self.vel_x *= self.friction
         self.vel_y *= self.friction
 
-        # Clamp velocity to maximum speed
-        vel_magnitude = math.sqrt(self.vel_x ** 2 + self.vel_y ** 2)
-        if vel_magnitude > self.speed:
-            vel_scale = self.speed / vel_magnitude
+        # Clamp velocity to maximum speed (compare squares; only take the root when clamping)
+        vel_sq = self.vel_x * self.vel_x + self.vel_y * self.vel_y
+        if vel_sq > self.speed * self.speed:
+            vel_scale = self.speed / math.sqrt(vel_sq)
             self.vel_x *= vel_scale
             self.vel_y *= vel_scale
 
@@ -2731,9 +3139,48 @@ class EnhancedPlayer(MovingEntity):
         return None
 
 
+def _scatter_positions(x, y, width, height, size, count):
+    """
+    Pick up to count non-overlapping top-left positions for size x size objects.
+
+    The area is cut into cells a little larger than an object and distinct
+    cells are sampled in one call, so objects never overlap and no rejection
+    sampling is needed; each object is jittered within the slack of its cell.
+    Returns no positions if an object doesn't fit in the area at all.
+    """
+    if width < size or height < size:
+        return []
+    cell = size * 3 // 2
+    slack = cell - size
+    cols = max(1, (width - size - slack) // cell + 1)
+    rows = max(1, (height - size - slack) // cell + 1)
+    # An area narrower than one cell only has room for part of the slack
+    slack_x = min(slack, width - size)
+    slack_y = min(slack, height - size)
+    cells = random.sample(range(cols * rows), min(count, cols * rows))
+    return [(x + (c % cols) * cell + random.randint(0, slack_x),
+             y + (c // cols) * cell + random.randint(0, slack_y)) for c in cells]
+
+
+# Town square residents: (entity_id, name, x, y, personality, backstory, color).
+# Negative coordinates are measured from the far edge of the map.
+_TOWN_SQUARE_NPCS = (
+    ("merchant", "Galen the Merchant", 200, 200, "friendly",
+     "I've been trading goods in this square for 20 years.", YELLOW),
+    ("elder", "Elder Miriam", -200, 200, "wise",
+     "I've watched over this town for more than three decades.", (138, 43, 226)),
+    ("guard", "Guard Tom", 200, -200, "stern",
+     "I keep the peace in this square day and night.", (178, 34, 34)),
+    ("artist", "Aria the Artist", -200, -200, "creative",
+     "I find inspiration for my art in the daily life of the square.", (34, 139, 34))
+)
+
+
 class Game:
     """Main game class"""
 
+    _LIGHT_CACHE = {}  # Baked player light gradients keyed by radius
+
     def __init__(self):
         # Initialize pygame and screen
         pygame.init()
@@ -2754,14 +3201,38 @@ class Game:
         self.particle_system = ParticleSystem()
         self.sprite_manager = SpriteManager()
         self.header_font = pygame.font.SysFont('Arial', 18, bold=True)
+        self.name_font = pygame.font.SysFont('Arial', 14)
+        self.pause_font = pygame.font.SysFont('Arial', 48, bold=True)
+        self.pause_hint_font = pygame.font.SysFont('Arial', 20)
+
+        # The pause dim never changes, so it is built once in the display format
+        self._pause_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA).convert_alpha()
+        self._pause_overlay.fill((0, 0, 0, 150))
+
+        # Lightning flash state for the enhanced weather renderer
+        self.lightning_start = 0
+        self.lightning_duration = 0
 
         # Game flags
         self.paused = False
+        self.pressed_keys = set()  # Key codes held down, tracked from KEYDOWN/KEYUP
+        self.frame_events = []  # Events drained from the queue this frame
+        # KEYDOWN dispatch outside of dialogue ('N' toggles NPC interactions)
+        self._key_handlers = {
+            pygame.K_ESCAPE: self._on_escape_key,
+            pygame.K_i: self._on_inventory_key,
+            pygame.K_e: self._on_interact_key,
+            pygame.K_n: self.toggle_npc_interactions,
+        }
+        self.frame_ticks = pygame.time.get_ticks()  # Clock reading for the current frame
+        self._last_room_check_xy = None  # Player position at the last room lookup
+        self._paused_frame = None  # Copy of the screen while paused, redrawn with one blit
 
         # NPC interaction manager
         self.npc_interaction_manager = NPCInteractionManager()
         self.npc_observer = NPCObserverSystem(self.memory_system)  # Use memory_system here
         self.npc_display = NPCAttributesDisplay()
+        self._nearby_npcs = []  # NPCs close enough to show attributes, refreshed in _update
         self.npc_follower_system = NPCFollowerSystem()
 
         # Initialize all NPCs with following capability and game_map reference
@@ -2840,30 +3311,14 @@ class Game:
             game_map.add_obstacle(wall)
 
         # Add NPCs (unchanged)
-        npcs = [
-            NPC("merchant", "Galen the Merchant", 200, 200,
-                personality="friendly",
-                backstory="I've been trading goods in this square for 20 years.",
-                location_id="town_square",
-                color=YELLOW),
-            NPC("elder", "Elder Miriam", map_width - 200, 200,
-                personality="wise",
-                backstory="I've watched over this town for more than three decades.",
-                location_id="town_square",
-                color=(138, 43, 226)),
-            NPC("guard", "Guard Tom", 200, map_height - 200,
-                personality="stern",
-                backstory="I keep the peace in this square day and night.",
-                location_id="town_square",
-                color=(178, 34, 34)),
-            NPC("artist", "Aria the Artist", map_width - 200, map_height - 200,
-                personality="creative",
-                backstory="I find inspiration for my art in the daily life of the square.",
-                location_id="town_square",
-                color=(34, 139, 34))
-        ]
-        for npc in npcs:
-            game_map.add_npc(npc)
+        for entity_id, name, x, y, personality, backstory, color in _TOWN_SQUARE_NPCS:
+            game_map.add_npc(NPC(entity_id, name,
+                                 x if x >= 0 else map_width + x,
+                                 y if y >= 0 else map_height + y,
+                                 personality=personality,
+                                 backstory=backstory,
+                                 location_id="town_square",
+                                 color=color))
 
         # Fountain-specific NPCs (unchanged)
         # fountain_npcs = create_fountain_interaction_npcs(game_map, map_width, map_height)
@@ -2930,17 +3385,15 @@ class Game:
 
     def _add_forest_details(self, game_map, forest_edge, deep_forest, hidden_glade):
         # Add trees to forest edge
-        for _ in range(20):
-            x = random.randint(forest_edge.x, forest_edge.x + forest_edge.width - 40)
-            y = random.randint(forest_edge.y, forest_edge.y + forest_edge.height - 40)
-            tree = Obstacle(f"tree_edge_{_}", "Tree", x, y, 40, 40, (0, 100, 0))
+        for i, (x, y) in enumerate(_scatter_positions(forest_edge.x, forest_edge.y,
+                                                      forest_edge.width, forest_edge.height, 40, 20)):
+            tree = Obstacle(f"tree_edge_{i}", "Tree", x, y, 40, 40, (0, 100, 0))
             game_map.add_obstacle(tree)
 
         # Add denser trees to deep forest
-        for _ in range(30):
-            x = random.randint(deep_forest.x, deep_forest.x + deep_forest.width - 50)
-            y = random.randint(deep_forest.y, deep_forest.y + deep_forest.height - 50)
-            tree = Obstacle(f"tree_deep_{_}", "Ancient Tree", x, y, 50, 50, (0, 60, 0))
+        for i, (x, y) in enumerate(_scatter_positions(deep_forest.x, deep_forest.y,
+                                                      deep_forest.width, deep_forest.height, 50, 30)):
+            tree = Obstacle(f"tree_deep_{i}", "Ancient Tree", x, y, 50, 50, (0, 60, 0))
             game_map.add_obstacle(tree)
 
         # Add mystical elements to hidden glade
@@ -2978,12 +3431,18 @@ class Game:
     def run(self):
         """Main game loop"""
         while self.running:
+            # Read the clock once; events, update and render all share this tick
+            self.frame_ticks = pygame.time.get_ticks()
+
             # Handle events
             self._handle_events()
 
             # Update game state if not paused
             if not self.paused and not self.dialogue_manager.is_active:
                 self._update()  # This should call update for all objects including AnimatedFountain
+            elif self.dialogue_manager.is_active:
+                # The world is frozen during dialogue, but NPC replies still need collecting
+                self.dialogue_manager.update(self.frame_ticks)
 
             # Render everything
             self._render()  # This should call render for AnimatedFountain
@@ -2992,40 +3451,56 @@ class Game:
             self.clock.tick(60)
 
         # Clean up
+        self.npc_interaction_manager.shutdown()
+        self.dialogue_manager.shutdown()
         pygame.quit()
         sys.exit()
 
     def _handle_events(self):
         """Handle pygame events"""
-        for event in pygame.event.get():
+        # Drain the queue once per frame; _update reads the same list
+        self.frame_events = pygame.event.get()
+        for event in self.frame_events:
             if event.type == pygame.QUIT:
                 self.running = False
 
+            # Track held keys here instead of polling the whole keyboard state
+            if event.type == pygame.KEYDOWN:
+                self.pressed_keys.add(event.key)
+                # The key may change what's shown, so the stored paused frame is rebuilt
+                self._paused_frame = None
+            elif event.type == pygame.KEYUP:
+                self.pressed_keys.discard(event.key)
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                # Key releases aren't delivered while unfocused
+                self.pressed_keys.clear()
+
             # When dialogue is active
             if self.dialogue_manager.is_active:
-                current_time = pygame.time.get_ticks()
-                self.dialogue_manager.handle_input(event, self.player, self.game_state, current_time)
+                self.dialogue_manager.handle_input(event, self.player, self.game_state, self.frame_ticks)
                 continue
 
             elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    if self.inventory_ui.is_visible:
-                        self.inventory_ui.toggle()
-                    else:
-                        self.paused = not self.paused
-
-                elif event.key == pygame.K_i:
-                    if not self.dialogue_manager.is_active:
-                        self.player.show_inventory = not self.player.show_inventory  # Toggle inventory visibility
-                        self.inventory_ui.toggle()
+                handler = self._key_handlers.get(event.key)
+                if handler:
+                    handler()
+
+    def _on_escape_key(self):
+        """Close the inventory if it's open, otherwise toggle pause"""
+        if self.inventory_ui.is_visible:
+            self.inventory_ui.toggle()
+        else:
+            self.paused = not self.paused
 
-                elif event.key == pygame.K_e:
-                    if not self.dialogue_manager.is_active and not self.inventory_ui.is_visible:
-                        self._handle_interaction()
+    def _on_inventory_key(self):
+        """Toggle inventory visibility"""
+        self.player.show_inventory = not self.player.show_inventory
+        self.inventory_ui.toggle()
 
-                elif event.key == pygame.K_n:
-                    # Toggle NPC interactions with the 'N' key
-                    self.toggle_npc_interactions()
+    def _on_interact_key(self):
+        """Interact with a nearby NPC unless the inventory is open"""
+        if not self.inventory_ui.is_visible:
+            self._handle_interaction()
 
     def _handle_interaction(self):
         nearest_npc = self.game_map.get_npc_near_position(
@@ -3033,25 +3508,36 @@ class Game:
         )
 
         if nearest_npc:
-            current_time = pygame.time.get_ticks()
             location_id = self.player.current_location
-            self.dialogue_manager.start_dialogue(nearest_npc, self.player, current_time, location_id)
+            self.dialogue_manager.start_dialogue(nearest_npc, self.player, self.frame_ticks, location_id)
             return
 
     def _update(self):
         """Update game state"""
-        keys = pygame.key.get_pressed()
-        events = pygame.event.get()  # Get the events
-        self.player.handle_input(keys, self.game_map, events)  # Pass events to handle_input
-        self.player.add_footstep_particle(self.game_state)
+        # Hand the same tick to everything this frame
+        current_time = self.frame_ticks
+
+        self.player.handle_input(self.pressed_keys, self.game_map, self.frame_events)
+        self.player.add_footstep_particle(self.game_state, current_time)
         self.particle_system.update()  # Update all particles
 
-        # Update all NPCs
-        for npc in self.game_map.npcs:
-            npc.update(self.game_map, self.game_state, self.player)
+        # Update all NPCs; ones well outside the view only tick their timers
+        view_rect = pygame.Rect(self.camera.x, self.camera.y, SCREEN_WIDTH, SCREEN_HEIGHT).inflate(
+            TILE_SIZE * 2, TILE_SIZE * 2)
+        game_map, game_state, player = self.game_map, self.game_state, self.player
+        in_view = view_rect.collidepoint
+        for npc in game_map.npcs:
+            if in_view(npc.x, npc.y):
+                npc.update(game_map, game_state, player, current_time)
+            else:
+                npc.update_offscreen(current_time)
+
+        # Only the spatial hash cells around the player need measuring, so
+        # _render doesn't check every NPC again
+        self._nearby_npcs = game_map.get_npcs_near_position(
+            player.x, player.y, INTERACTION_DISTANCE * 1.5)
 
         # Update animated obstacles (fountains)
-        current_time = pygame.time.get_ticks()
         for obstacle in self.game_map.obstacles:
             if isinstance(obstacle, AnimatedFountain):
                 obstacle.update(current_time)
@@ -3062,25 +3548,20 @@ class Game:
         self.game_state.update()
 
         # Update player's current location
-        current_room = self.game_map.get_room_at_position(self.player.x, self.player.y)
-        if current_room:
-            self.player.current_location = current_room.room_id
+        self._update_player_location()
 
         # Update NPC interactions
         self.npc_interaction_manager.update(self.game_map, self.game_state, current_time)
         self.npc_interaction_manager.update_conversations(self.game_state, current_time)
 
-        current_time = pygame.time.get_ticks()
         self.npc_observer.update(self.game_map, self.player, current_time)
         self.dialogue_manager.update(current_time)
 
         # Update NPC following behavior
-        current_time = pygame.time.get_ticks()
         for npc in self.game_map.npcs:
             self.npc_follower_system.update_following(npc, current_time)
 
         # Update NPC following behavior
-        current_time = pygame.time.get_ticks()
         for npc in self.game_map.npcs:
             if hasattr(npc, 'follow_state') and npc.follow_state == NPCFollowState.FOLLOWING:
                 print(f"Updating following for {npc.name}")  # Debug print
@@ -3089,17 +3570,46 @@ class Game:
         # Update other game state
         self.game_state.update()
 
-        # Update player's current location
-        current_room = self.game_map.get_room_at_position(self.player.x, self.player.y)
-        if current_room:
-            self.player.current_location = current_room.room_id
-
         # Update camera position
         self.camera.update(self.player.x, self.player.y,
                            self.game_map.width, self.game_map.height)
 
+    def _update_player_location(self):
+        """Look up the player's room, but only once they've moved far enough to leave it"""
+        px, py = self.player.x, self.player.y
+        if self._last_room_check_xy is not None:
+            lx, ly = self._last_room_check_xy
+            if (px - lx) ** 2 + (py - ly) ** 2 <= 32 * 32:
+                return
+        self._last_room_check_xy = (px, py)
+
+        current_room = self.game_map.get_room_at_position(px, py)
+        if current_room:
+            self.player.current_location = current_room.room_id
+
+    @classmethod
+    def _get_light_surface(cls, light_radius):
+        """Get the warm radial light gradient, drawn once per radius"""
+        light_surface = cls._LIGHT_CACHE.get(light_radius)
+        if light_surface is None:
+            light_surface = pygame.Surface((light_radius * 2, light_radius * 2), pygame.SRCALPHA).convert_alpha()
+            for r in range(light_radius, 0, -1):
+                alpha = 0 if r > light_radius - 5 else min(180, int(180 * (1 - r / light_radius)))
+                color = (255, 220, 150, alpha)  # Warm light color
+                pygame.draw.circle(light_surface, color, (light_radius, light_radius), r)
+            cls._LIGHT_CACHE[light_radius] = light_surface
+        return light_surface
+
     def _render(self):
         """Render the game with optimized visual effects"""
+        # Nothing updates while paused, so the paused frame is drawn once and then reused
+        if self.paused and self._paused_frame is not None:
+            self.screen.blit(self._paused_frame, (0, 0))
+            pygame.display.flip()
+            return
+
+        current_time = self.frame_ticks
+
         # Fill background
         self.screen.fill(BLACK)
 
@@ -3117,42 +3627,45 @@ class Game:
                 obstacle.render(self.screen, self.camera.x, self.camera.y)
 
         # Render NPCs (shadows and sprites only, no attributes box yet)
+        view_rect = pygame.Rect(self.camera.x, self.camera.y, SCREEN_WIDTH, SCREEN_HEIGHT).inflate(
+            TILE_SIZE * 2, TILE_SIZE * 2)
+        shadow_blits = []
+        npc_blits = []
         for npc in self.game_map.npcs:
-            # Draw NPC shadow
-            shadow_x = npc.x - self.camera.x + 4
-            shadow_y = npc.y - self.camera.y + npc.height - 4
-            shadow_width = npc.width - 8
-            shadow_height = npc.height // 3
-            shadow_rect = pygame.Rect(shadow_x, shadow_y, shadow_width, shadow_height)
-            pygame.draw.ellipse(self.screen, (0, 0, 0, 60), shadow_rect)
-
-            # Draw NPC sprite
-            npc_sprite = npc.get_current_sprite()
-            self.screen.blit(npc_sprite, (npc.x - self.camera.x, npc.y - self.camera.y))
+            # Skip sprite and animation work for NPCs that can't be seen
+            if not view_rect.collidepoint(npc.x, npc.y):
+                continue
+
+            # Queue NPC shadow
+            shadow_blits.append((NPC._get_shadow(npc.width, npc.height),
+                                 (npc.x - self.camera.x + 4, npc.y - self.camera.y + npc.height - 4)))
+
+            # Queue NPC sprite straight from its atlas region
+            npc_blits.append(npc.get_blit_tuple(self.camera.x, self.camera.y, current_time))
+
+        # Draw every NPC shadow, then every NPC sprite above them, one call each
+        self.screen.blits(shadow_blits, doreturn=False)
+        self.screen.blits(npc_blits, doreturn=False)
 
         # Render player
-        self.screen.blit(self.player.get_current_sprite(),
+        self.screen.blit(self.player.get_current_sprite(current_time),
                          (self.player.x - self.camera.x, self.player.y - self.camera.y))
 
         # Render NPC interactions (speech bubbles)
         self.npc_interaction_manager.render(self.screen, self.camera.x, self.camera.y)
 
         # Optional: Add player lighting effect during dark times
-        if self.game_state.time_of_day in [TimeOfDay.EVENING, TimeOfDay.NIGHT]:
+        if self.game_state.is_dark:
             light_radius = self.player.light_radius
-            light_surface = pygame.Surface((light_radius * 2, light_radius * 2), pygame.SRCALPHA)
-            for r in range(light_radius, 0, -1):
-                alpha = 0 if r > light_radius - 5 else min(180, int(180 * (1 - r / light_radius)))
-                color = (255, 220, 150, alpha)  # Warm light color
-                pygame.draw.circle(light_surface, color, (light_radius, light_radius), r)
+            light_surface = self._get_light_surface(light_radius)
             light_x = self.player.x - self.camera.x + self.player.width // 2 - light_radius
             light_y = self.player.y - self.camera.y + self.player.height // 2 - light_radius
             self.screen.blit(light_surface, (light_x, light_y), special_flags=pygame.BLEND_ADD)
 
         # Apply time of day color overlay
-        time_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        time_overlay.fill(self.game_state.get_time_color_overlay())
-        self.screen.blit(time_overlay, (0, 0))
+        time_overlay = self.game_state.get_time_overlay(SCREEN_WIDTH, SCREEN_HEIGHT)
+        if time_overlay:
+            self.screen.blit(time_overlay, (0, 0))
 
         # Apply weather effects
         self.game_state.render_weather_effect(self.screen)
@@ -3161,25 +3674,21 @@ class Game:
         self.hud.render(self.screen, self.player, self.game_state, self.game_map)
 
         # Render dialogue if active
-        self.dialogue_manager.render(self.screen)
+        self.dialogue_manager.render(self.screen, self.frame_ticks)
 
         # Render inventory if visible
         self.inventory_ui.render(self.screen, self.player, self.game_map)
 
         # Render pause overlay if paused
         if self.paused:
-            pause_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-            pause_overlay.fill((0, 0, 0, 150))
-            self.screen.blit(pause_overlay, (0, 0))
+            self.screen.blit(self._pause_overlay, (0, 0))
 
-            pause_font = pygame.font.SysFont('Arial', 48, bold=True)
-            pause_text = pause_font.render("PAUSED", True, WHITE)
+            pause_text = render_text(self.pause_font, "PAUSED", WHITE)
             text_rect = pause_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
             self.screen.blit(pause_text, text_rect)
 
-            instructions_font = pygame.font.SysFont('Arial', 20)
-            instructions_text = instructions_font.render(
-                "Press ESC to resume, Q to quit", True, WHITE
+            instructions_text = render_text(
+                self.pause_hint_font, "Press ESC to resume, Q to quit", WHITE
             )
             inst_rect = instructions_text.get_rect(
                 center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50)
@@ -3187,13 +3696,17 @@ class Game:
             self.screen.blit(instructions_text, inst_rect)
 
         # Render NPC attributes if nearby and not in dialogue
-        current_time = pygame.time.get_ticks()
-        for npc in self.game_map.npcs:
-            if (self.player.distance_to(npc) < INTERACTION_DISTANCE * 1.5 and
-                    not self.dialogue_manager.is_active):
+        if not self.dialogue_manager.is_active:
+            for npc in self._nearby_npcs:
                 self.npc_display.render(self.screen, npc, self.camera.x, self.camera.y,
                                         INTERACTION_DISTANCE, current_time)
 
+        # Keep the paused frame for reuse, unless an open dialogue may still change it
+        if self.paused and not self.dialogue_manager.is_active:
+            self._paused_frame = self.screen.copy()
+        else:
+            self._paused_frame = None
+
         # Update display
         pygame.display.flip()
 
@@ -3561,17 +4074,45 @@ def get_hf_token():
     return token
 
 
-def query_local_model(npc, environment_state, player_message):
+# Words that end a conversation when the model can't be reached
+_GOODBYE_WORDS = frozenset({"goodbye", "bye", "farewell", "leave"})
+
+# Farewell cues checked before the model answers; multi-word cues are matched as phrases
+_FAREWELL_WORDS = frozenset({"goodbye", "bye", "farewell", "leave", "later"})
+_FAREWELL_PHRASES = ("see you", "take care")
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def _message_words(text):
+    """Lowercase words of a message, with punctuation stripped"""
+    return _WORD_RE.findall(text.lower())
+
+
+def _is_farewell_text(text):
+    """Check a message for farewell words or phrases in a single tokenizing pass"""
+    if not _FAREWELL_WORDS.isdisjoint(_message_words(text)):
+        return True
+    lower = text.lower()
+    return any(phrase in lower for phrase in _FAREWELL_PHRASES)
+
+
+def query_local_model(npc, environment_state, player_message, raise_errors=False):
     """
     Generate contextually appropriate NPC dialogue using Hugging Face's API.
     Debug version with print statements to track farewell detection.
+
+    Nothing on the NPC is changed here, so this can run off the game loop;
+    callers apply the friendship adjustment and farewell text themselves.
+
+    If the model can't be reached, a stock reply is returned, or the error is
+    re-raised when raise_errors is set so callers can tell it apart from a
+    real answer (e.g. to keep it out of a cache).
     """
     try:
         print(f"Analyzing message: {player_message}")  # Debug print
 
         # Check for basic farewell words first
-        basic_farewell_words = {"goodbye", "bye", "farewell", "leave", "see you", "later", "take care"}
-        basic_farewell = any(word in player_message.lower() for word in basic_farewell_words)
+        basic_farewell = _is_farewell_text(player_message)
         print(f"Basic farewell check: {basic_farewell}")  # Debug print
 
         # Construct a detailed prompt for the language model
@@ -3636,20 +4177,9 @@ def query_local_model(npc, environment_state, player_message):
         print(f"Final farewell status: {is_farewell}")  # Debug print
 
         # If it's a farewell, ensure the response is a goodbye
-        if is_farewell and not any(word in dialogue_response.lower() for word in basic_farewell_words):
+        if is_farewell and not _is_farewell_text(dialogue_response):
             dialogue_response += " Farewell, safe travels!"
 
-        # Clean the response text (remove quotes if present)
-        clean_response = dialogue_response.strip('"')
-
-        # Set floating text for farewell
-        if is_farewell:
-            print(f"Setting floating text: {clean_response}")  # Debug print
-            npc.set_floating_text(clean_response, 5000)  # 5 seconds
-
-        # Update the NPC's friendship meter
-        npc.update_friendship(friendship_adjustment)
-
         print(
             f"Returning: response='{dialogue_response}', adjustment={friendship_adjustment}, farewell={is_farewell}")  # Debug print
         return dialogue_response, friendship_adjustment, is_farewell
@@ -3658,17 +4188,21 @@ def query_local_model(npc, environment_state, player_message):
         logger.error(f"NLP Dialogue Generation Error: {e}")
         # Fallback
         print(f"Error in query_local_model: {e}")  # Debug print
-        basic_farewell = any(word in player_message.lower() for word in ["goodbye", "bye", "farewell", "leave"])
+        if raise_errors:
+            raise
+        basic_farewell = not _GOODBYE_WORDS.isdisjoint(_message_words(player_message))
         return f"I'm sorry, I'm having trouble understanding.", 0, basic_farewell
 
 
 # Expose the function for use in the dialogue system
-def simulate_npc_response(npc, environment_state, player_message):
-    """Wrapper to handle any potential exceptions"""
+def simulate_npc_response(npc, environment_state, player_message, raise_errors=False):
+    """Wrapper to handle any potential exceptions, unless raise_errors is set"""
     try:
-        return query_local_model(npc, environment_state, player_message)
+        return query_local_model(npc, environment_state, player_message, raise_errors)
     except Exception as e:
         print(f"Dialogue generation failed: {e}")
+        if raise_errors:
+            raise
         return f"Hello, I'm {npc.name}. I'm afraid I can't quite understand you right now."
 
 
@@ -3677,6 +4211,11 @@ def simulate_npc_response(npc, environment_state, player_message):
 #############
 
 class InventoryItem:
+    __slots__ = ('item_id', 'name', 'description', 'value', 'weight', 'category', 'icon', 'quantity')
+
+    # Plain grey icon shared by every item without its own; built on first use
+    _DEFAULT_ICON = None
+
     def __init__(self, item_id, name, description, value, weight, category, icon=None):
         self.item_id = item_id
         self.name = name
@@ -3684,39 +4223,48 @@ class InventoryItem:
         self.value = value
         self.weight = weight
         self.category = category
-        self.icon = icon or self._create_default_icon()
+        self.icon = icon or self._get_default_icon()
         self.quantity = 1
 
-    def _create_default_icon(self):
-        icon = pygame.Surface((32, 32), pygame.SRCALPHA)
-        pygame.draw.rect(icon, (150, 150, 150), (0, 0, 32, 32))
-        return icon
+    @classmethod
+    def _get_default_icon(cls):
+        if cls._DEFAULT_ICON is None:
+            # A flat fill has no transparency, so an opaque surface will do
+            icon = pygame.Surface((32, 32))
+            icon.fill((150, 150, 150))
+            cls._DEFAULT_ICON = icon.convert()
+        return cls._DEFAULT_ICON
 
 class EnhancedInventory:
+    # Quantity label font, created on first render (needs pygame.font initialized)
+    _font = None
+
     def __init__(self, capacity=100.0):
         self.items = []
+        self._by_id = {}  # item_id -> the stack holding that item
         self.max_capacity = capacity
         self.current_weight = 0.0
         self.selected_item = None
         self.drag_offset = None
 
     def add_item(self, item):
-        if self.current_weight + item.weight > self.max_capacity:
+        added_weight = item.weight * item.quantity
+        if self.current_weight + added_weight > self.max_capacity:
             return False
 
-        for inv_item in self.items:
-            if inv_item.item_id == item.item_id:
-                inv_item.quantity += item.quantity
-                self.current_weight += item.weight
-                return True
-
-        self.items.append(item)
-        self.current_weight += item.weight
+        inv_item = self._by_id.get(item.item_id)
+        if inv_item is not None:
+            inv_item.quantity += item.quantity
+        else:
+            self.items.append(item)
+            self._by_id[item.item_id] = item
+        self.current_weight += added_weight
         return True
 
     def remove_item(self, item):
-        if item in self.items:
+        if self._by_id.get(item.item_id) is item:
             self.items.remove(item)
+            del self._by_id[item.item_id]
             self.current_weight -= (item.weight * item.quantity)
             return True
         return False
@@ -3731,15 +4279,21 @@ class EnhancedInventory:
         self.drag_offset = None
 
     def render(self, surface):
+        if EnhancedInventory._font is None:
+            EnhancedInventory._font = pygame.font.SysFont('Arial', 12)
+        font = EnhancedInventory._font
+
+        # Icons and quantity labels go out in a single blits call
+        blit_sequence = []
         for i, item in enumerate(self.items):
             x = 50 + (i % 5) * 60
             y = 50 + (i // 5) * 60
-            surface.blit(item.icon, (x, y))
+            blit_sequence.append((item.icon, (x, y)))
 
             if item.quantity > 1:
-                font = pygame.font.SysFont('Arial', 12)
-                qty_text = font.render(str(item.quantity), True, (255, 255, 255))
-                surface.blit(qty_text, (x + 20, y + 20))
+                qty_text = render_text(font, str(item.quantity), (255, 255, 255))
+                blit_sequence.append((qty_text, (x + 20, y + 20)))
+        surface.blits(blit_sequence, doreturn=False)
 
         if self.selected_item and self.drag_offset:
             mouse_pos = pygame.mouse.get_pos()
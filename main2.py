@@ -11,7 +11,9 @@ from enum import Enum
 from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional, Any
 
-from game_classes import GameMap, Entity, MovingEntity, Direction, EntityType, Weather, TimeOfDay, Game
+from game_classes import (GameMap, Entity, MovingEntity, Direction, EntityType, Weather, Game, NPC,
+                          build_bolt_templates)
+from text_cache import render_text
 
 # Initialize pygame
 pygame.init()
@@ -264,6 +266,81 @@ def _update(self):
         self.player.current_location = current_room.room_id
 
 
+_glow_cache = {}  # Baked item glow gradients keyed by (shine size, color)
+
+
+def _get_glow_surface(shine_size, color):
+    """Get the radial glow drawn behind an item's shine, built once per size and color"""
+    key = (shine_size, tuple(color[:3]))
+    glow_surf = _glow_cache.get(key)
+    if glow_surf is None:
+        glow_surf = pygame.Surface((shine_size * 4, shine_size * 4), pygame.SRCALPHA).convert_alpha()
+        for radius in range(shine_size * 2, 0, -2):
+            alpha = max(5, 40 - radius * 2)
+            pygame.draw.circle(glow_surf, (*key[1], alpha), (shine_size * 2, shine_size * 2), radius)
+        _glow_cache[key] = glow_surf
+    return glow_surf
+
+
+_item_sprites = {}  # Items with glow and shine baked in, keyed by (width, height, color)
+
+
+def _get_item_sprite(width, height, color):
+    """
+    Get an item's body, glow and shine baked into one sprite.
+
+    The glow reaches past the body's top-left corner, so the sprite is padded
+    and returned with the offset of the body inside it.
+
+    Returns:
+        tuple: (sprite, (offset_x, offset_y))
+    """
+    key = (width, height, tuple(color[:3]))
+    baked = _item_sprites.get(key)
+    if baked is None:
+        shine_size = min(width, height) // 3
+        shine_x, shine_y = width // 4, height // 4
+        offset_x = max(0, shine_size * 2 - shine_x)
+        offset_y = max(0, shine_size * 2 - shine_y)
+        sprite = pygame.Surface((offset_x + max(width, shine_x + shine_size * 2),
+                                 offset_y + max(height, shine_y + shine_size * 2)), pygame.SRCALPHA)
+        glow_surf = _get_glow_surface(shine_size, key[2])
+        glow_pos = (offset_x + shine_x - shine_size * 2, offset_y + shine_y - shine_size * 2)
+        body_rect = pygame.Rect(offset_x, offset_y, width, height)
+
+        # Soft halo around the body, then the body brightened by the glow
+        sprite.blit(glow_surf, glow_pos)
+        pygame.draw.rect(sprite, key[2], body_rect)
+        sprite.set_clip(body_rect)
+        sprite.blit(glow_surf, glow_pos, special_flags=pygame.BLEND_RGB_ADD)
+        sprite.set_clip(None)
+
+        # Main shine on top
+        pygame.draw.circle(sprite, WHITE, (offset_x + shine_x, offset_y + shine_y), shine_size)
+
+        baked = _item_sprites[key] = (sprite.convert_alpha(), (offset_x, offset_y))
+    return baked
+
+
+_name_panels = {}  # Name tags with their backing, keyed by (font, name)
+
+
+def _get_name_panel(font, name):
+    """Get a name tag already drawn on its semi-transparent backing"""
+    key = (font, name)
+    panel = _name_panels.get(key)
+    if panel is None:
+        name_surface = render_text(font, name, WHITE)
+
+        # Add background for better readability
+        panel = pygame.Surface((name_surface.get_width() + 10, name_surface.get_height() + 6),
+                               pygame.SRCALPHA).convert_alpha()
+        panel.fill((0, 0, 0, 150))
+        panel.blit(name_surface, (5, 3))
+        _name_panels[key] = panel
+    return panel
+
+
 # Update the Game._render method to include enhanced visual effects
 def _render(self):
     """Render the game with enhanced visual effects"""
@@ -276,78 +353,48 @@ def _render(self):
     # Draw player footstep particles
     self.player.render_particles(self.screen, self.camera.x, self.camera.y)
 
-    # Render items
+    # Anything whose anchor lies outside this rect can't be seen this frame
+    view_rect = pygame.Rect(self.camera.x, self.camera.y, SCREEN_WIDTH, SCREEN_HEIGHT).inflate(
+        TILE_SIZE * 2, TILE_SIZE * 2)
+
+    # Render items from their baked sprites in one call
+    item_blits = []
     for item in self.game_map.items:
-        if not item.is_collected:
-            item_rect = pygame.Rect(
-                item.x - self.camera.x,
-                item.y - self.camera.y,
-                item.width,
-                item.height
-            )
-            pygame.draw.rect(self.screen, item.color, item_rect)
-
-            # Add shine effect with glow
-            shine_size = min(item.width, item.height) // 3
-            shine_pos = (
-                item.x - self.camera.x + item.width // 4,
-                item.y - self.camera.y + item.height // 4
-            )
-
-            # Draw glow
-            glow_surf = pygame.Surface((shine_size * 4, shine_size * 4), pygame.SRCALPHA)
-            for radius in range(shine_size * 2, 0, -2):
-                alpha = max(5, 40 - radius * 2)
-                pygame.draw.circle(glow_surf, (*item.color[:3], alpha), (shine_size * 2, shine_size * 2), radius)
-
-            self.screen.blit(glow_surf,
-                             (shine_pos[0] - shine_size * 2, shine_pos[1] - shine_size * 2),
-                             special_flags=pygame.BLEND_ADD)
-
-            # Draw main shine
-            pygame.draw.circle(self.screen, WHITE, shine_pos, shine_size)
+        if not item.is_collected and view_rect.collidepoint(item.x, item.y):
+            sprite, (offset_x, offset_y) = _get_item_sprite(item.width, item.height, item.color)
+            item_blits.append((sprite, (item.x - self.camera.x - offset_x, item.y - self.camera.y - offset_y)))
+    self.screen.blits(item_blits, doreturn=False)
 
     # Render player shadow first (appears beneath player)
     self.player.render_shadow(self.screen, self.camera.x, self.camera.y)
 
     # Render NPCs with shadows
+    shadow_blits = []
+    npc_blits = []
     for npc in self.game_map.npcs:
-        # Draw NPC shadow (simple offset version)
-        shadow_x = npc.x - self.camera.x + 4
-        shadow_y = npc.y - self.camera.y + npc.height - 4
-        shadow_width = npc.width - 8
-        shadow_height = npc.height // 3
-
-        shadow_rect = pygame.Rect(
-            shadow_x,
-            shadow_y,
-            shadow_width,
-            shadow_height
-        )
+        # Skip the shadow and sprite work for off-screen NPCs
+        if not view_rect.collidepoint(npc.x, npc.y):
+            continue
+
+        # Queue NPC shadow (simple offset version)
+        shadow_blits.append((NPC._get_shadow(npc.width, npc.height),
+                             (npc.x - self.camera.x + 4, npc.y - self.camera.y + npc.height - 4)))
+
+        # Queue NPC sprite
+        npc_blits.append(npc.get_blit_tuple(self.camera.x, self.camera.y))
 
-        # Draw semi-transparent shadow
-        pygame.draw.ellipse(self.screen, (0, 0, 0, 60), shadow_rect)
-
-        # Draw NPC
-        npc_sprite = npc.get_current_sprite()
-        self.screen.blit(npc_sprite,
-                         (npc.x - self.camera.x, npc.y - self.camera.y))
-
-        # Render NPC name above if close to player
-        if self.player.distance_to(npc) < INTERACTION_DISTANCE * 1.5:
-            name_font = pygame.font.SysFont('Arial', 14)
-            name_surface = name_font.render(npc.name, True, WHITE)
-            name_rect = name_surface.get_rect()
-            name_rect.midbottom = (npc.x - self.camera.x + npc.width // 2,
-                                   npc.y - self.camera.y - 5)
-
-            # Add background for better readability
-            bg_rect = name_rect.copy()
-            bg_rect.inflate_ip(10, 6)
-            bg_surface = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
-            bg_surface.fill((0, 0, 0, 150))
-            self.screen.blit(bg_surface, bg_rect)
-            self.screen.blit(name_surface, name_rect)
+    # Draw every shadow, then every sprite above them, one call each
+    self.screen.blits(shadow_blits, doreturn=False)
+    self.screen.blits(npc_blits, doreturn=False)
+
+    # Render NPC names above those the spatial hash finds close to the player
+    for npc in self.game_map.get_npcs_near_position(self.player.x, self.player.y,
+                                                    INTERACTION_DISTANCE * 1.5):
+        name_panel = _get_name_panel(self.name_font, npc.name)
+
+        # The panel pads the name by 3px below, so it sits 2px above the NPC
+        self.screen.blit(name_panel, name_panel.get_rect(
+            midbottom=(npc.x - self.camera.x + npc.width // 2, npc.y - self.camera.y - 2)))
 
     # Render player
     player_sprite = self.player.get_current_sprite()
@@ -356,15 +403,9 @@ def _render(self):
                       self.player.y - self.camera.y))
 
     # Optional: Add player lighting effect during dark times
-    if self.game_state.time_of_day in [TimeOfDay.EVENING, TimeOfDay.NIGHT]:
+    if self.game_state.is_dark:
         light_radius = self.player.light_radius
-        light_surface = pygame.Surface((light_radius * 2, light_radius * 2), pygame.SRCALPHA)
-
-        # Create radial gradient
-        for r in range(light_radius, 0, -1):
-            alpha = 0 if r > light_radius - 5 else min(180, int(180 * (1 - r / light_radius)))
-            color = (255, 220, 150, alpha)  # Warm light color
-            pygame.draw.circle(light_surface, color, (light_radius, light_radius), r)
+        light_surface = Game._get_light_surface(light_radius)
 
         # Position light centered on player
         light_x = self.player.x - self.camera.x + self.player.width // 2 - light_radius
@@ -372,9 +413,9 @@ def _render(self):
         self.screen.blit(light_surface, (light_x, light_y), special_flags=pygame.BLEND_ADD)
 
     # Apply time of day color overlay
-    time_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-    time_overlay.fill(self.game_state.get_time_color_overlay())
-    self.screen.blit(time_overlay, (0, 0))
+    time_overlay = self.game_state.get_time_overlay(SCREEN_WIDTH, SCREEN_HEIGHT)
+    if time_overlay:
+        self.screen.blit(time_overlay, (0, 0))
 
     # Apply weather effects with more variation
     if self.game_state.weather != Weather.CLEAR:
@@ -386,25 +427,21 @@ def _render(self):
     self.hud.render(self.screen, self.player, self.game_state, self.game_map)
 
     # Render dialogue if active
-    self.dialogue_manager.render(self.screen)
+    self.dialogue_manager.render(self.screen, self.frame_ticks)
 
     # Render inventory if visible
     self.inventory_ui.render(self.screen, self.player, self.game_map)
 
     # Render pause overlay if paused
     if self.paused:
-        pause_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        pause_overlay.fill((0, 0, 0, 150))
-        self.screen.blit(pause_overlay, (0, 0))
+        self.screen.blit(self._pause_overlay, (0, 0))
 
-        pause_font = pygame.font.SysFont('Arial', 48, bold=True)
-        pause_text = pause_font.render("PAUSED", True, WHITE)
+        pause_text = render_text(self.pause_font, "PAUSED", WHITE)
         text_rect = pause_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
         self.screen.blit(pause_text, text_rect)
 
-        instructions_font = pygame.font.SysFont('Arial', 20)
-        instructions_text = instructions_font.render(
-            "Press ESC to resume, Q to quit", True, WHITE
+        instructions_text = render_text(
+            self.pause_hint_font, "Press ESC to resume, Q to quit", WHITE
         )
         inst_rect = instructions_text.get_rect(
             center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50)
@@ -415,54 +452,39 @@ def _render(self):
     pygame.display.flip()
 
 
-def _render_enhanced_weather_effects(self):
-    """Render enhanced weather effects"""
-    width, height = self.screen.get_size()
-    weather_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+_RAIN_PHASES = 8  # Pre-rendered rain sheets cycled through for drop flicker
 
-    if self.game_state.weather == Weather.CLOUDY:
-        # Add dynamic clouds
-        weather_surface.fill((200, 200, 200, 40))
-        current_time = pygame.time.get_ticks() // 50  # Slow time factor
-        for i in range(5):
-            cloud_x = (current_time // (10 + i * 5) + i * width // 5) % (width + 200) - 100
-            cloud_y = height // 10 + i * 20
-            cloud_width = 100 + i * 30
-            cloud_height = 40 + i * 10
 
-            # Draw cloud shape
-            for j in range(5):
-                offset_x = j * cloud_width // 8
-                offset_y = math.sin(j * 0.8) * 5
-                size = cloud_height // 2 + j * 5
-                pygame.draw.circle(weather_surface, (220, 220, 220, 20),
-                                   (int(cloud_x + offset_x), int(cloud_y + offset_y)), size)
+def _draw_wrapped_line(surface, color, start, end, thickness, width, height):
+    """Draw a line on a tiling surface, repeating it across the wrap edges"""
+    for shift_x in (0, width):
+        for shift_y in (-height, 0):
+            pygame.draw.line(surface, color,
+                             (start[0] + shift_x, start[1] + shift_y),
+                             (end[0] + shift_x, end[1] + shift_y), thickness)
 
-    elif self.game_state.weather == Weather.RAINY:
-        # Add blue-gray overlay and animated rain drops
-        weather_surface.fill((100, 100, 150, 60))
-        current_time = pygame.time.get_ticks()
-        rain_count = 100
 
+def _build_rain_frames(width, height, rain_count=100):
+    """Pre-render seamless rain sheets; each frame only scrolls one of them"""
+    angle = math.pi / 6  # 30 degrees
+    sin_angle, cos_angle = math.sin(angle), math.cos(angle)
+    frames = []
+    for _ in range(_RAIN_PHASES):
+        frame = pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha()
         for i in range(rain_count):
-            # Use time to animate rain vertically
+            # Drop positions at scroll offset zero
             seed = i * 10
-            x = (seed * 97 + current_time // 20) % width
-            y_offset = (current_time // 10 + seed * 13) % height
-            y = (y_offset + seed * 17) % height
+            x = seed * 97 % width
+            y = seed * 30 % height
 
             length = random.randint(5, 15)
             thickness = 1 if random.random() < 0.8 else 2
 
-            # Add slight angle to rain
-            angle = math.pi / 6  # 30 degrees
-            end_x = x - math.sin(angle) * length
-            end_y = y + math.cos(angle) * length
-
             # Vary drop alpha based on distance from camera
             alpha = random.randint(100, 200)
-            pygame.draw.line(weather_surface, (200, 200, 255, alpha),
-                             (x, y), (end_x, end_y), thickness)
+            _draw_wrapped_line(frame, (200, 200, 255, alpha), (x, y),
+                               (x - sin_angle * length, y + cos_angle * length),
+                               thickness, width, height)
 
             # Occasionally add splash effect
             if random.random() < 0.02:
@@ -470,12 +492,91 @@ def _render_enhanced_weather_effects(self):
                 splash_y = random.randint(0, height)
 
                 for j in range(3):
-                    angle = random.random() * math.pi * 2
+                    splash_angle = random.random() * math.pi * 2
                     splash_length = random.randint(2, 4)
-                    splash_end_x = splash_x + math.cos(angle) * splash_length
-                    splash_end_y = splash_y + math.sin(angle) * splash_length
-                    pygame.draw.line(weather_surface, (200, 200, 255, 100),
-                                     (splash_x, splash_y), (splash_end_x, splash_end_y), 1)
+                    splash_end_x = splash_x + math.cos(splash_angle) * splash_length
+                    splash_end_y = splash_y + math.sin(splash_angle) * splash_length
+                    _draw_wrapped_line(frame, (200, 200, 255, 100), (splash_x, splash_y),
+                                       (splash_end_x, splash_end_y), 1, width, height)
+        frames.append(frame)
+    return frames
+
+
+def _build_cloud_sprites():
+    """
+    Pre-render the five cloud shapes once.
+
+    Pixels outside the cloud are opaque white, so blitting with BLEND_RGBA_MIN
+    leaves the overlay untouched there and stamps the thinner cloud alpha inside.
+
+    Returns:
+        list: (sprite, left, top) per cloud, offsets relative to the cloud anchor
+    """
+    sprites = []
+    for i in range(5):
+        cloud_width = 100 + i * 30
+        cloud_height = 40 + i * 10
+        circles = []
+        for j in range(5):
+            offset_x = j * cloud_width // 8
+            offset_y = math.floor(math.sin(j * 0.8) * 5)
+            size = cloud_height // 2 + j * 5
+            circles.append((offset_x, offset_y, size))
+
+        left = min(ox - size for ox, oy, size in circles)
+        top = min(oy - size for ox, oy, size in circles)
+        right = max(ox + size for ox, oy, size in circles)
+        bottom = max(oy + size for ox, oy, size in circles)
+
+        sprite = pygame.Surface((right - left + 1, bottom - top + 1), pygame.SRCALPHA).convert_alpha()
+        sprite.fill((255, 255, 255, 255))
+        for offset_x, offset_y, size in circles:
+            pygame.draw.circle(sprite, (220, 220, 220, 20),
+                               (offset_x - left, offset_y - top), size)
+        sprites.append((sprite, left, top))
+    return sprites
+
+
+def _render_enhanced_weather_effects(self):
+    """Render enhanced weather effects"""
+    width, height = self.screen.get_size()
+
+    # Overlay layers are built on the first weather frame and reused after
+    weather_cache = getattr(self, '_weather_cache', None)
+    if weather_cache is None or weather_cache['size'] != (width, height):
+        weather_cache = self._weather_cache = {
+            'size': (width, height),
+            'overlay': pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha(),
+            'flash': pygame.Surface((width, height), pygame.SRCALPHA).convert_alpha(),
+            Weather.RAINY: _build_rain_frames(width, height),
+            Weather.CLOUDY: _build_cloud_sprites(),
+        }
+    weather_surface = weather_cache['overlay']
+
+    if self.game_state.weather == Weather.CLOUDY:
+        # Add dynamic clouds
+        weather_surface.fill((200, 200, 200, 40))
+        current_time = pygame.time.get_ticks() // 50  # Slow time factor
+        cloud_blits = []
+        for i, (sprite, left, top) in enumerate(weather_cache[Weather.CLOUDY]):
+            cloud_x = (current_time // (10 + i * 5) + i * width // 5) % (width + 200) - 100
+            cloud_y = height // 10 + i * 20
+            cloud_blits.append((sprite, (cloud_x + left, cloud_y + top), None, pygame.BLEND_RGBA_MIN))
+        weather_surface.blits(cloud_blits, doreturn=False)
+
+    elif self.game_state.weather == Weather.RAINY:
+        # Add blue-gray overlay and animated rain drops
+        weather_surface.fill((100, 100, 150, 60))
+        current_time = pygame.time.get_ticks()
+        frames = weather_cache[Weather.RAINY]
+        rain = frames[(current_time // 50) % len(frames)]
+
+        # Scroll the seamless sheet; MAX keeps the drop colors over the tint
+        x = current_time // 20 % width
+        y = current_time // 10 % height
+        weather_surface.blits([(rain, pos, None, pygame.BLEND_RGBA_MAX)
+                               for pos in ((x - width, y - height), (x, y - height),
+                                           (x - width, y), (x, y))], doreturn=False)
 
     elif self.game_state.weather == Weather.FOGGY:
         # Add dynamic fog
@@ -485,18 +586,28 @@ def _render_enhanced_weather_effects(self):
         # Create fog layer
         weather_surface.fill((255, 255, 255, base_alpha))
 
-        # Add swirling fog patterns
-        for i in range(8):
-            fog_x = (current_time // (20 + i * 10) + i * 100) % (width * 2) - width // 2
-            fog_y = height // 4 + math.sin(current_time / 1000 + i) * height // 8
-            fog_radius = 100 + i * 30
-
-            # Vary fog density
-            fog_alpha = 20 + int(15 * math.sin(current_time / 500 + i * 0.5))
-
-            for r in range(fog_radius, 0, -fog_radius // 5):
-                pygame.draw.circle(weather_surface, (255, 255, 255, fog_alpha),
-                                   (int(fog_x), int(fog_y)), r)
+        # Fog only moves every 100ms, so the blob layout is reused between steps
+        if weather_cache.get('fog_time') != current_time:
+            fog_blobs = []
+            for i in range(8):
+                fog_x = (current_time // (20 + i * 10) + i * 100) % (width * 2) - width // 2
+                fog_y = height // 4 + math.sin(current_time / 1000 + i) * height // 8
+                fog_radius = 100 + i * 30
+
+                # Vary fog density
+                fog_alpha = 20 + int(15 * math.sin(current_time / 500 + i * 0.5))
+                fog_blobs.append(((255, 255, 255, fog_alpha), (int(fog_x), int(fog_y)), fog_radius))
+            weather_cache['fog_time'] = current_time
+            weather_cache['fog_blobs'] = fog_blobs
+
+        # Add swirling fog patterns; inner rings shared the outer ring's color,
+        # so one disc per blob covers them all, drawn under a single lock
+        weather_surface.lock()
+        try:
+            for color, center, radius in weather_cache['fog_blobs']:
+                pygame.draw.circle(weather_surface, color, center, radius)
+        finally:
+            weather_surface.unlock()
 
     elif self.game_state.weather == Weather.STORMY:
         # Dark overlay with lightning
@@ -510,49 +621,23 @@ def _render_enhanced_weather_effects(self):
             self.lightning_duration = random.randint(50, 150)
 
         # If lightning is active, draw it
-        if hasattr(self, 'lightning_start') and current_time - self.lightning_start < self.lightning_duration:
+        if current_time - self.lightning_start < self.lightning_duration:
             # Calculate flash intensity (peaks in the middle)
             progress = (current_time - self.lightning_start) / self.lightning_duration
             intensity = math.sin(progress * math.pi)
             flash_alpha = int(200 * intensity)
 
             # Create lightning flash
-            flash_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            flash_surface = weather_cache['flash']
             flash_surface.fill((255, 255, 255, flash_alpha))
             weather_surface.blit(flash_surface, (0, 0))
 
-            # Add lightning bolt occasionally
+            # Add a pre-drawn jagged lightning bolt occasionally
             if random.random() < 0.3 and flash_alpha > 100:
-                # Draw jagged lightning bolt
-                bolt_start_x = random.randint(0, width)
-                bolt_start_y = 0
-                bolt_segments = random.randint(4, 8)
-                bolt_width = 3
-
-                last_x, last_y = bolt_start_x, bolt_start_y
-                for j in range(bolt_segments):
-                    next_x = last_x + random.randint(-80, 80)
-                    next_y = last_y + height // bolt_segments
-
-                    # Draw main bolt
-                    pygame.draw.line(weather_surface, (200, 200, 255, 240),
-                                     (last_x, last_y), (next_x, next_y), bolt_width)
-
-                    # Add glow
-                    for k in range(3):
-                        glow_width = bolt_width + k * 2
-                        glow_alpha = 150 - k * 50
-                        pygame.draw.line(weather_surface, (200, 200, 255, glow_alpha),
-                                         (last_x, last_y), (next_x, next_y), glow_width)
-
-                    # Add occasional fork
-                    if random.random() < 0.3:
-                        fork_x = next_x + random.randint(-40, 40)
-                        fork_y = next_y + random.randint(10, 30)
-                        pygame.draw.line(weather_surface, (200, 200, 255, 200),
-                                         (next_x, next_y), (fork_x, fork_y), bolt_width - 1)
-
-                    last_x, last_y = next_x, next_y
+                if 'bolts' not in weather_cache:
+                    weather_cache['bolts'] = build_bolt_templates(height)
+                bolt, anchor_x = random.choice(weather_cache['bolts'])
+                weather_surface.blit(bolt, (random.randint(0, width) - anchor_x, 0))
 
             # Add distant thunder sound effect here if you have audio support
 
@@ -2,20 +2,125 @@ import pygame
 import logging
 import textwrap
 import random
+import math
+import re
+import time
+import hashlib
+import sqlite3
+import threading
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Any
 from constants import *
 import os
+import itertools
+from collections import OrderedDict, Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 logger = logging.getLogger(__name__)
 
 # Import EventType from your memory system
 from game_enums import EventType
 from sprite_manager import SpriteManager
+from text_cache import render_text
 
 DIALOG_PADDING = 20
 LINE_HEIGHT = 20
 MAX_VISIBLE_LINES = 4
+HISTORY_LINE_LIMIT = 128  # Most recent wrapped lines kept for display and scrollback
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = 300000  # ms before a cached reply is asked for again
+RESPONSE_DISK_TTL = 7 * 24 * 60 * 60  # seconds a reply saved to disk stays usable
+EVENT_FLUSH_INTERVAL = 500  # ms between handing queued events to the memory system
+SIMILAR_PROMPT_THRESHOLD = 0.92  # cosine similarity of word counts needed to reuse a reply
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Phrases that ask an NPC to follow, matched anywhere in the input in one pass
+_FOLLOW_COMMANDS = (
+    "follow me",
+    "come with me",
+    "follow",
+    "join me",
+    "come along",
+    "accompany me"
+)
+_FOLLOW_COMMAND_RE = re.compile("|".join(map(re.escape, _FOLLOW_COMMANDS)), re.IGNORECASE)
+
+# Stat bars in the details column: label, value at a full bar, color
+_STAT_BARS = (
+    ("Friendship", 100, (0, 255, 0)),  # Green
+    ("Health", 100, (255, 0, 0)),  # Red
+    ("Wealth", 500, (255, 215, 0)),  # Gold
+    ("Mana", 100, (0, 0, 255))  # Blue
+)
+STAT_BAR_WIDTH = 180  # Match screenshot width
+STAT_BAR_HEIGHT = 11  # Match screenshot height
+STAT_BAR_SPACING = 30
+STAT_BAR_Y_OFFSET = 3  # Lines the bars up with the label text baseline
+
+
+_glyph_advances = {}  # font -> {character: advance width in pixels}, filled as characters turn up
+WRAP_ESTIMATE_SLACK = 0.9  # Lines estimated under this share of the width skip exact measuring
+
+
+def _estimate_width(font, text):
+    """
+    Estimate the rendered width of text by adding up per-character advances.
+
+    Each character is measured once per font; kerning is ignored, so the result
+    is close but not exact.
+    """
+    advances = _glyph_advances.get(font)
+    if advances is None:
+        advances = _glyph_advances[font] = {}
+    width = 0
+    for char in text:
+        advance = advances.get(char)
+        if advance is None:
+            advance = advances[char] = font.size(char)[0]
+        width += advance
+    return width
+
+
+def _wrap_to_width(font, text, max_width):
+    """
+    Word-wrap text so no line renders wider than max_width pixels in font.
+
+    Lines that are clearly short enough by the glyph estimate are accepted
+    without asking the font; near the edge they are measured exactly. Words
+    too long for a line on their own are split between characters.
+    """
+    lines = []
+    line = ""
+    line_estimate = 0
+    space_width = _estimate_width(font, " ")
+    for word in text.split():
+        word_estimate = _estimate_width(font, word)
+        if line:
+            candidate = f"{line} {word}"
+            candidate_estimate = line_estimate + space_width + word_estimate
+        else:
+            candidate = word
+            candidate_estimate = word_estimate
+        if (candidate_estimate <= max_width * WRAP_ESTIMATE_SLACK
+                or font.size(candidate)[0] <= max_width):
+            line = candidate
+            line_estimate = candidate_estimate
+            continue
+        if line:
+            lines.append(line)
+        # Break up a word that can't fit on a line by itself
+        while font.size(word)[0] > max_width and len(word) > 1:
+            cut = len(word) - 1
+            while cut > 1 and font.size(word[:cut])[0] > max_width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        line = word
+        line_estimate = _estimate_width(font, word)
+    if line:
+        lines.append(line)
+    return lines
 
 
 class DialogueNodeType(Enum):
@@ -30,48 +135,489 @@ class DialogueNodeType(Enum):
     GOSSIP = "gossip"
 
 
-@dataclass
+@dataclass(slots=True)
 class DialogueNode:
     """A single node in a dialogue tree"""
     id: str
     type: DialogueNodeType
     text: str
-    responses: List[str] = None  # List of child node IDs
-    conditions: Dict[str, Any] = None  # Conditions for this node to be available
-    actions: Dict[str, Any] = None  # Actions to perform when this node is chosen
-    metadata: Dict[str, Any] = None  # Additional data for this node
+    responses: List[str] = field(default_factory=list)  # List of child node IDs
+    conditions: Dict[str, Any] = field(default_factory=dict)  # Conditions for this node to be available
+    actions: Dict[str, Any] = field(default_factory=dict)  # Actions to perform when this node is chosen
+    metadata: Dict[str, Any] = field(default_factory=dict)  # Additional data for this node
+
+
+def _default_reply_cache_path():
+    """Return where the reply cache is kept: the user's cache directory, not the working directory"""
+    cache_dir = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+                 or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_dir, "npc_rpg", "dialogue_cache.sqlite")
+
+
+class ReplyDiskCache:
+    """
+    NPC replies saved in a SQLite file so they carry over between sessions.
+
+    Lookups and writes happen on the reply thread pool, never the game loop.
+    The connection is opened on first use, and expired rows are dropped then.
+    If the file can't be used, the cache turns itself off and every lookup
+    misses.
+    """
+
+    def __init__(self, path, ttl_seconds=RESPONSE_DISK_TTL):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._conn = None
+        self._disabled = False
+        self._lock = threading.Lock()  # One connection shared by the pool's threads
+
+    @staticmethod
+    def make_key(prompt_key):
+        """Turn an in-memory prompt key into a stable text key"""
+        return hashlib.blake2b(repr(prompt_key).encode("utf-8"), digest_size=16).hexdigest()
+
+    def _connect(self):
+        """Open the database, creating the table and pruning expired replies"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS replies ("
+            "key TEXT PRIMARY KEY, stored_at REAL, response TEXT, adjustment INTEGER, is_farewell INTEGER)"
+        )
+        conn.execute("DELETE FROM replies WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+        return conn
+
+    def _execute(self, sql, params):
+        """Run a statement, returning its first row, or None if the cache is unusable"""
+        with self._lock:
+            if self._disabled:
+                return None
+            try:
+                if self._conn is None:
+                    self._conn = self._connect()
+                return self._conn.execute(sql, params).fetchone()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Disabling dialogue reply cache at {self.path}: {e}")
+                self._disabled = True
+                return None
+
+    def get(self, key):
+        """Return the saved (response, adjustment, is_farewell) for key, or None"""
+        row = self._execute(
+            "SELECT response, adjustment, is_farewell FROM replies WHERE key = ? AND stored_at >= ?",
+            (key, time.time() - self.ttl_seconds)
+        )
+        if row is None:
+            return None
+        response, adjustment, is_farewell = row
+        return response, adjustment, bool(is_farewell)
+
+    def put(self, key, reply):
+        """Save a (response, adjustment, is_farewell) reply under key"""
+        response, adjustment, is_farewell = reply
+        self._execute(
+            "INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?, ?)",
+            (key, time.time(), response, adjustment, int(is_farewell))
+        )
 
 
 class EnhancedDialogueManager:
-    def __init__(self, memory_system, game_instance):
+    _font = None  # Shared dialogue fonts, created by the first manager
+    _header_font = None
+
+    def __init__(self, memory_system, game_instance, reply_cache_path=None):
         self.memory_system = memory_system
         self.game_instance = game_instance  # Store game reference
         self.is_active = False
         self.current_npc = None
         self.dialogue_history = []
+        self._history_lines = deque(maxlen=HISTORY_LINE_LIMIT)  # (line, color) of the latest wrapped lines
+        self._history_version = 0  # Bumped whenever _history_lines changes
         self.player_input = ""
+        self._input_chars = []  # Typed characters; player_input is their joined text
         self.input_active = False
         self.scroll_offset = 0
         self.max_visible_entries = 4
-        self.font = pygame.font.SysFont('Arial', 16)
-        self.header_font = pygame.font.SysFont('Arial', 18, bold=True)
+        if EnhancedDialogueManager._font is None:
+            EnhancedDialogueManager._font = pygame.font.SysFont('Arial', 16)
+            EnhancedDialogueManager._header_font = pygame.font.SysFont('Arial', 18, bold=True)
+        self.font = EnhancedDialogueManager._font
+        self.header_font = EnhancedDialogueManager._header_font
         self.free_text_mode = True
         self.ending_conversation = False
         self.goodbye_message = None
         self.goodbye_timer = 0
         self.is_processing_response = False
+        self._layout = None  # Boxes, backgrounds and line counts for the current screen size
+        self._wrap_width = SCREEN_WIDTH * 2 // 3 - DIALOG_PADDING - 20  # Pixel width history lines wrap to
+        self._panel_key = None  # What the dialogue panel was last drawn from
+        self._details = (None, [])  # ((personality, location, backstory), NPC detail surfaces)
+        self._response_cache = OrderedDict()  # prompt key -> (time stored, model reply), oldest first
+        self._similar_prompts = {}  # prompt key minus input -> [(word counts, norm, prompt key)]
+
+        # The model can take seconds to answer, so replies are generated off
+        # the game loop and collected in update()
+        self._reply_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="npc-reply")
+        self._pending_reply = None  # (future, prompt key, "Thinking..." history entry)
+        self._reply_disk_cache = ReplyDiskCache(reply_cache_path or _default_reply_cache_path())
+
+        # Memory events are queued and recorded together from update()
+        self._pending_events = []  # (event type, player, details, location id, time, npc)
+        self._last_event_flush = 0
+
+    def _get_layout(self, size):
+        """
+        Return the dialogue UI geometry for a screen size, worked out once per size.
+
+        Everything is drawn onto a panel blitted at base_y, so the boxes are
+        positioned relative to the top of the panel.
+        """
+        if self._layout is not None and self._layout["size"] == size:
+            return self._layout
+
+        width, height = size
+
+        # Calculate total dialogue interface height (half screen height)
+        total_dialogue_height = height // 2
+
+        # Position the entire dialogue interface at the bottom of the screen
+        base_y = height - total_dialogue_height
+
+        # Input box height and position
+        input_box_height = 40
+        input_box_y = total_dialogue_height - input_box_height
+
+        # Dialogue box positioned above input box
+        dialogue_height = total_dialogue_height - input_box_height - 10  # Subtract input box and padding
+        dialogue_y = 0  # Start at the top of the panel
+
+        # Adjust column sizes: Left 2/3, Right 1/3
+        dialogue_box = pygame.Rect(0, dialogue_y, width * 2 / 3, dialogue_height)
+        details_box_width = width * 1 / 3
+        details_box_x = width * 2 / 3
+
+        def background(bg_size, color):
+            bg = pygame.Surface((int(bg_size[0]), int(bg_size[1])), pygame.SRCALPHA)
+            bg.fill(color)
+            return bg
+
+        # Calculate max entries based on available height
+        line_height = self.font.get_height() + 2
+
+        # Lines start DIALOG_PADDING + 10 in and keep 10px clear of the right border
+        wrap_width = int(dialogue_box.width) - DIALOG_PADDING - 20
+        if wrap_width != self._wrap_width:
+            self._wrap_width = wrap_width
+            for entry in self.dialogue_history:
+                self._wrap_history_entry(entry)
+            self._rebuild_history_lines()
+
+        self._layout = {
+            "size": size,
+            "base_y": base_y,
+            "dialogue_y": dialogue_y,
+            "dialogue_height": dialogue_height,
+            "dialogue_box": dialogue_box,
+            "details_box": pygame.Rect(details_box_x, dialogue_y, details_box_width, dialogue_height),
+            "details_box_x": details_box_x,
+            "details_box_width": details_box_width,
+            "input_box": pygame.Rect(
+                DIALOG_PADDING,
+                input_box_y,
+                width - (DIALOG_PADDING * 2),
+                input_box_height - 10
+            ),
+            "panel": pygame.Surface((width, total_dialogue_height), pygame.SRCALPHA),
+            # Semi-transparent backgrounds for the dialogue and the details
+            "dialogue_bg": background((dialogue_box.width, dialogue_height), (0, 0, 0, 100)),
+            "details_bg": background((details_box_width, dialogue_height), (50, 50, 50, 200)),
+            "stat_bars": self._build_stat_bars(details_box_x, dialogue_y),
+            "line_height": line_height,
+            "max_visible_lines": int((dialogue_height - 20) / line_height),  # Subtract padding
+            "up_triangle": [
+                (width // 3 - 10, dialogue_y + 10),
+                (width // 3, dialogue_y + 5),
+                (width // 3 + 10, dialogue_y + 10)
+            ],
+            "down_triangle": [
+                (width // 3 - 10, dialogue_y + dialogue_height - 10),
+                (width // 3, dialogue_y + dialogue_height - 5),
+                (width // 3 + 10, dialogue_y + dialogue_height - 10)
+            ]
+        }
+        self._clamp_scroll()
+        return self._layout
+
+    def _get_detail_surfaces(self, npc):
+        """Return the rendered NPC detail lines, rebuilt only when the details change"""
+        details_key = (npc.personality, npc.location_id, npc.backstory)
+        if self._details[0] != details_key:
+            details = [
+                f"Personality: {npc.personality}",
+                f"Location: {npc.location_id}",
+                f"Backstory: {textwrap.shorten(npc.backstory, width=30)}"
+            ]
+            self._details = (details_key, [render_text(self.font, detail, WHITE) for detail in details])
+        return self._details[1]
+
+    def _build_stat_bars(self, details_box_x, dialogue_y):
+        """
+        Lay out the details column's stat bars.
+
+        The troughs and borders never change, so they are drawn once onto an
+        overlay; only the filled part of each bar is drawn with the panel.
+
+        Returns:
+            dict: The overlay and its position, plus each bar's label surface and
+                position and the origin of its fillable interior
+        """
+        # Bars start below the three NPC detail lines
+        top = dialogue_y + 10 + 3 * (self.font.get_height() + 3) + 5
+
+        # Align all bars at the same x-position, just after the longest label
+        label_surfaces = [render_text(self.font, label, WHITE) for label, _, _ in _STAT_BARS]
+        bar_x = 10 + max(label_surface.get_width() for label_surface in label_surfaces) + 10
+
+        overlay = pygame.Surface((bar_x + STAT_BAR_WIDTH, len(_STAT_BARS) * STAT_BAR_SPACING), pygame.SRCALPHA)
+        labels = []
+        fills = []
+        for i, label_surface in enumerate(label_surfaces):
+            bar_y = i * STAT_BAR_SPACING
+            bar_rect = (bar_x, bar_y + STAT_BAR_Y_OFFSET, STAT_BAR_WIDTH, STAT_BAR_HEIGHT)
+            pygame.draw.rect(overlay, (128, 128, 128), bar_rect)  # Gray background
+            pygame.draw.rect(overlay, WHITE, bar_rect, 1)  # Thin white border
+
+            labels.append((label_surface, (details_box_x + 10, top + bar_y)))
+            fills.append((details_box_x + bar_x + 1, top + bar_y + STAT_BAR_Y_OFFSET + 1))
+
+        return {"overlay": overlay, "pos": (details_box_x, top), "labels": labels, "fills": fills}
+
+    @staticmethod
+    def _response_key(npc, environment_state, input_text):
+        """Build a cache key from everything that goes into the NPC's prompt"""
+        return (
+            npc.name,
+            npc.personality,
+            npc.location_id,
+            environment_state["time_of_day"],
+            environment_state["weather"],
+            environment_state["days_passed"],
+            tuple(sorted(environment_state["events"])),
+            " ".join(input_text.lower().split())
+        )
+
+    def _get_cached_response(self, key, current_time):
+        """Return a stored reply for key if it hasn't expired, else None"""
+        cached = self._response_cache.get(key)
+        if cached is None:
+            return None
+        stored_at, reply = cached
+        if current_time - stored_at >= RESPONSE_CACHE_TTL:
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return reply
+
+    @staticmethod
+    def _word_vector(text):
+        """Return the word counts of text and their euclidean norm"""
+        counts = Counter(_WORD_RE.findall(text.lower()))
+        return counts, math.sqrt(sum(n * n for n in counts.values()))
+
+    def _get_similar_response(self, key, current_time):
+        """
+        Return the reply to an earlier prompt worded almost the same way.
+
+        Only prompts to the same NPC under the same conditions are compared,
+        and entries whose reply has left the exact cache are dropped.
+        """
+        candidates = self._similar_prompts.get(key[:-1])
+        if not candidates:
+            return None
+        counts, norm = self._word_vector(key[-1])
+        if not norm:
+            return None
+
+        best_key, best_score = None, SIMILAR_PROMPT_THRESHOLD
+        live = []
+        for other_counts, other_norm, other_key in candidates:
+            if other_key not in self._response_cache:
+                continue
+            live.append((other_counts, other_norm, other_key))
+            dot = sum(n * other_counts[word] for word, n in counts.items())
+            score = dot / (norm * other_norm)
+            if score > best_score:
+                best_key, best_score = other_key, score
+        candidates[:] = live
+
+        if best_key is None:
+            return None
+        return self._get_cached_response(best_key, current_time)
+
+    def _store_response(self, key, reply, current_time):
+        """Remember a reply, dropping the least recently used one when full"""
+        if key not in self._response_cache:
+            counts, norm = self._word_vector(key[-1])
+            if norm:
+                self._similar_prompts.setdefault(key[:-1], []).append((counts, norm, key))
+        self._response_cache[key] = (current_time, reply)
+        self._response_cache.move_to_end(key)
+        if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+            evicted_key, _ = self._response_cache.popitem(last=False)
+            # Drop its word vector too, so similar-prompt lists don't outgrow the cache
+            candidates = self._similar_prompts.get(evicted_key[:-1])
+            if candidates:
+                candidates[:] = [c for c in candidates if c[2] != evicted_key]
+                if not candidates:
+                    del self._similar_prompts[evicted_key[:-1]]
+
+    def _request_response(self, game_state, current_input, current_time):
+        """Answer from the reply cache, or ask the NPC in the background"""
+        npc = self.current_npc
+        environment_state = game_state.get_environment_state(npc.location_id)
+        cache_key = self._response_key(npc, environment_state, current_input)
+        reply = self._get_cached_response(cache_key, current_time)
+        if reply is None:
+            reply = self._get_similar_response(cache_key, current_time)
+
+        # Show a waiting message until the reply is in
+        self.is_processing_response = True
+        entry = self._add_history_entry("npc", f"{npc.name}: Thinking...",
+                                        DialogueNodeType.RESPONSE.value)
+        if reply is not None:
+            self._apply_reply(entry, reply, current_time)
+        else:
+            future = self._reply_pool.submit(self._fetch_reply, npc, environment_state, current_input, cache_key)
+            self._pending_reply = (future, cache_key, entry)
+
+    def _fetch_reply(self, npc, environment_state, current_input, cache_key):
+        """
+        Get a reply from the disk cache, or from the NPC if it isn't saved. Runs on the reply pool.
+
+        Returns:
+            tuple: (reply, disk key to save it under, or None if it came from disk)
+        """
+        disk_key = ReplyDiskCache.make_key(cache_key)
+        reply = self._reply_disk_cache.get(disk_key)
+        if reply is not None:
+            return reply, None
+        # Failures raise instead of returning a stock reply, so only real answers get saved
+        return npc.simulate_npc_response(environment_state, current_input, raise_errors=True), disk_key
+
+    def _apply_reply(self, entry, reply, current_time):
+        """Put an NPC reply in place of its waiting message and act on it"""
+        response, adjustment, is_farewell = reply
+
+        self._set_entry_text(entry, f"{self.current_npc.name}: {response}")
+        self.is_processing_response = False
+
+        # Cached replies move the friendship meter just like fresh ones
+        self.current_npc.update_friendship(adjustment)
+
+        if is_farewell:
+            # Clean the response text
+            clean_response = response.strip('"')
+            # Set floating text before ending dialogue
+            self.current_npc.set_floating_text(clean_response, 5000)
+            # End dialogue
+            self.end_dialogue(current_time)
+
+    def shutdown(self):
+        """Stop the reply threads, dropping replies not yet started; call when the game exits"""
+        self._cancel_pending_reply()
+        self._reply_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _cancel_pending_reply(self):
+        """Drop a reply that is still being generated"""
+        if self._pending_reply:
+            self._pending_reply[0].cancel()
+            self._pending_reply = None
+            self.is_processing_response = False
+
+    def _set_input_chars(self, chars):
+        """Replace the typed characters and refresh player_input from them"""
+        self._input_chars = chars
+        self.player_input = "".join(chars)
+
+    def _queue_event(self, event_type, player, details, location_id, current_time, npc):
+        """Queue an event for the memory system; it is recorded on the next flush"""
+        self._pending_events.append((event_type, player, details, location_id, current_time, npc))
+
+    def _flush_events(self, current_time):
+        """Record all queued events with the memory system"""
+        self._last_event_flush = current_time
+        if not self._pending_events:
+            return
+        events, self._pending_events = self._pending_events, []
+        record_event = self.memory_system.record_event
+        for event_type, player, details, location_id, event_time, npc in events:
+            record_event(event_type, player, details, location_id, event_time, npc=npc)
 
     def _check_follow_command(self, input_text: str) -> bool:
         """Check if input is a follow command"""
-        follow_commands = [
-            "follow me",
-            "come with me",
-            "follow",
-            "join me",
-            "come along",
-            "accompany me"
-        ]
-        return any(cmd in input_text.lower() for cmd in follow_commands)
+        return _FOLLOW_COMMAND_RE.search(input_text) is not None
+
+    def _add_history_entry(self, speaker, text, node_type=None):
+        """Append a dialogue history entry, wrapping its text once up front"""
+        entry = {"speaker": speaker, "text": text}
+        if node_type is not None:
+            entry["node_type"] = node_type
+        self._wrap_history_entry(entry)
+        self.dialogue_history.append(entry)
+        self._extend_history_lines(entry)
+        return entry
+
+    def _wrap_history_entry(self, entry):
+        """Store the wrapped display lines for an entry so render doesn't rewrap every frame"""
+        if entry["speaker"] == "player":
+            display_name = "You"
+        else:
+            display_name = self.current_npc.name if self.current_npc else "NPC"
+        entry["wrapped"] = _wrap_to_width(self.font, f"{display_name}: {entry['text']}", self._wrap_width)
+
+    def _extend_history_lines(self, entry):
+        """Add an entry's wrapped lines to the display lines, in its speaker's color"""
+        text_color = LIGHT_BLUE if entry["speaker"] == "player" else YELLOW
+        self._history_lines.extend((line, text_color) for line in entry["wrapped"])
+        self._history_version += 1
+        self._clamp_scroll()
+
+    def _rebuild_history_lines(self):
+        """Refill the display lines from the whole history; the deque keeps only the tail"""
+        self._history_lines.clear()
+        for entry in self.dialogue_history:
+            self._extend_history_lines(entry)
+        self._history_version += 1
+        self._clamp_scroll()
+
+    def _max_scroll_offset(self):
+        """Return how many lines back the history can be scrolled at the current layout"""
+        if self._layout is None:
+            return 0
+        return max(0, len(self._history_lines) - self._layout["max_visible_lines"])
+
+    def _clamp_scroll(self):
+        """Keep scroll_offset within the history; called whenever it or the line count changes"""
+        max_scroll_offset = self._max_scroll_offset()
+        if self.scroll_offset > max_scroll_offset:
+            self.scroll_offset = max_scroll_offset
+        elif self.scroll_offset < 0:
+            self.scroll_offset = 0
+
+    def _set_entry_text(self, entry, text):
+        """Change a history entry's text and rewrap it"""
+        old_line_count = len(entry["wrapped"])
+        entry["text"] = text
+        self._wrap_history_entry(entry)
+        if self.dialogue_history and entry is self.dialogue_history[-1]:
+            # The latest entry's lines are at the end of the deque; swap just those
+            for _ in range(min(old_line_count, len(self._history_lines))):
+                self._history_lines.pop()
+            self._extend_history_lines(entry)
+        else:
+            self._rebuild_history_lines()
 
     def handle_input(self, event, player, game_state, current_time):
         """Handle player input in dialogue mode."""
@@ -80,18 +626,16 @@ class EnhancedDialogueManager:
 
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
-                self.end_dialogue()
+                self.end_dialogue(current_time)
                 return
 
             elif event.key == pygame.K_RETURN:
-                if self.player_input.strip():
+                # Wait for the NPC to answer before sending anything else
+                if self.player_input.strip() and self._pending_reply is None:
                     current_input = self.player_input
 
                     # Add player input to dialogue history
-                    self.dialogue_history.append({
-                        "speaker": "player",
-                        "text": current_input
-                    })
+                    self._add_history_entry("player", current_input)
 
                     if self.current_npc:
                         # Check for follow command
@@ -105,64 +649,38 @@ class EnhancedDialogueManager:
                             )
 
                             # Add NPC's response to dialogue history
-                            self.dialogue_history.append({
-                                "speaker": "npc",
-                                "text": f"{self.current_npc.name}: {message}",
-                                "node_type": DialogueNodeType.RESPONSE.value
-                            })
+                            self._add_history_entry("npc", f"{self.current_npc.name}: {message}",
+                                                    DialogueNodeType.RESPONSE.value)
 
                             # If NPC agreed to follow, end dialogue
                             if success:
                                 self.current_npc.set_floating_text(message, 3000)
-                                self.end_dialogue()
+                                self.end_dialogue(current_time)
 
                             self.is_processing_response = False
                         else:
-                            # Handle regular dialogue
-                            try:
-                                # Set processing flag and show waiting message
-                                self.is_processing_response = True
-                                self.dialogue_history.append({
-                                    "speaker": "npc",
-                                    "text": f"{self.current_npc.name}: Thinking...",
-                                    "node_type": DialogueNodeType.RESPONSE.value
-                                })
-
-                                # Get NPC response
-                                response, adjustment, is_farewell = self.current_npc.simulate_npc_response(
-                                    game_state.get_environment_state(self.current_npc.location_id),
-                                    current_input
-                                )
-
-                                # Replace waiting message with actual response
-                                self.dialogue_history[-1]["text"] = f"{self.current_npc.name}: {response}"
-                                self.is_processing_response = False
-
-                                if is_farewell:
-                                    # Clean the response text
-                                    clean_response = response.strip('"')
-                                    # Set floating text before ending dialogue
-                                    self.current_npc.set_floating_text(clean_response, 5000)
-                                    # End dialogue
-                                    self.end_dialogue()
-
-                            except Exception as e:
-                                print(f"Error processing response: {e}")
-                                self.dialogue_history.append({
-                                    "speaker": "npc",
-                                    "text": f"{self.current_npc.name}: I'm having trouble understanding."
-                                })
-                                self.is_processing_response = False
+                            # Handle regular dialogue, reusing the reply to an identical prompt
+                            self._request_response(game_state, current_input, current_time)
 
                     # Reset scroll and clear input
                     self.scroll_offset = 0
-                    self.player_input = ""
+                    self._set_input_chars([])
+
+            elif event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                # Scroll back through the history a few lines at a time
+                step = MAX_VISIBLE_LINES if event.key == pygame.K_PAGEUP else -MAX_VISIBLE_LINES
+                self.scroll_offset += step
+                self._clamp_scroll()
 
             elif event.key == pygame.K_BACKSPACE:
-                self.player_input = self.player_input[:-1]
+                if self._input_chars:
+                    self._input_chars.pop()
+                    self.player_input = "".join(self._input_chars)
             else:
-                if len(self.player_input) < 50:  # Limit input length
-                    self.player_input += event.unicode
+                # Limit input length; modifier and control keys carry no printable text
+                if len(self._input_chars) < 50 and event.unicode and event.unicode.isprintable():
+                    self._input_chars.append(event.unicode)
+                    self.player_input = "".join(self._input_chars)
 
     def update(self, current_time):
         """
@@ -177,6 +695,27 @@ class EnhancedDialogueManager:
                 self.goodbye_message = None
                 self.goodbye_timer = 0
 
+        if self._pending_events and (not self.is_active or
+                                     current_time - self._last_event_flush >= EVENT_FLUSH_INTERVAL):
+            self._flush_events(current_time)
+
+        # Collect the NPC's reply once the model has finished. A reply whose
+        # dialogue was cancelled is never collected, so it changes nothing.
+        if self._pending_reply and self._pending_reply[0].done():
+            future, cache_key, entry = self._pending_reply
+            self._pending_reply = None
+            try:
+                reply, disk_key = future.result()
+                if disk_key is not None:
+                    self._reply_pool.submit(self._reply_disk_cache.put, disk_key, reply)
+                self._apply_reply(entry, reply, current_time)
+                # Only fresh replies are stored, so a cached one still expires on time
+                self._store_response(cache_key, reply, current_time)
+            except Exception as e:
+                print(f"Error processing response: {e}")
+                self._set_entry_text(entry, f"{self.current_npc.name}: I'm having trouble understanding.")
+                self.is_processing_response = False
+
         # You can add additional update logic here if needed
         # For example, tracking conversation duration, managing dialogue state, etc.
 
@@ -185,13 +724,15 @@ class EnhancedDialogueManager:
         self.is_active = True
         self.current_npc = npc
         self.dialogue_history = []
+        self._rebuild_history_lines()
         self.ending_conversation = False
         self.goodbye_message = None
         self.goodbye_timer = 0
+        self._cancel_pending_reply()
         self.is_processing_response = False  # Reset processing flag
 
         # Reset input state based on mode
-        self.player_input = ""
+        self._set_input_chars([])
         self.input_active = True
         self.scroll_offset = 0
 
@@ -201,235 +742,162 @@ class EnhancedDialogueManager:
             npc.relationship_manager = self.memory_system.get_relationship_manager(npc)
 
         # Record this conversation
-        self.memory_system.record_event(
+        self._queue_event(
             EventType.CONVERSATION,
             player,
             {"initiated_by": "player"},
             location_id,
             current_time,
-            npc=npc
+            npc
         )
 
         # Add a greeting message to the dialogue history
-        self.dialogue_history.append({
-            "speaker": "npc",
-            "text": f"{npc.name}: Hello! How can I help you?",
-            "node_type": DialogueNodeType.GREETING.value
-        })
+        self._add_history_entry("npc", f"{npc.name}: Hello! How can I help you?",
+                                DialogueNodeType.GREETING.value)
+
+        # Render the NPC's details up front rather than on the first frame
+        self._get_detail_surfaces(npc)
 
         # Mark NPC as talking
         npc.is_talking = True
 
-    def end_dialogue(self):
+    def end_dialogue(self, now_ms=None):
         """End the current dialogue"""
+        if now_ms is None:
+            now_ms = pygame.time.get_ticks()
+
+        self._cancel_pending_reply()
+        self._flush_events(now_ms)
         if self.current_npc:
             self.current_npc.is_talking = False
             # Record the end of conversation in memory system if available
             if hasattr(self.current_npc, 'relationship_manager'):
                 relationship = self.current_npc.relationship_manager
-                relationship.last_interaction_time = pygame.time.get_ticks()
+                relationship.last_interaction_time = now_ms
 
             # Set the goodbye message and timer
             self.goodbye_message = self.current_npc.floating_text
-            self.goodbye_timer = pygame.time.get_ticks()
+            self.goodbye_timer = now_ms
 
         self.is_active = False
         self.current_npc = None
         self.input_active = False
         self.ending_conversation = False
 
-    def render(self, surface):
+    def render(self, surface, now_ms=None):
         """Render dialogue UI with scrolling support, NPC details, and real-time friendship bar"""
         if not self.is_active:
             return
 
-        width, height = surface.get_size()
-
-        # Calculate total dialogue interface height (half screen height)
-        total_dialogue_height = height // 2
-
-        # Position the entire dialogue interface at the bottom of the screen
-        base_y = height - total_dialogue_height
-
-        # Input box height and position
-        input_box_height = 40
-        input_box_y = height - input_box_height
-
-        # Dialogue box positioned above input box
-        dialogue_height = total_dialogue_height - input_box_height - 10  # Subtract input box and padding
-        dialogue_y = base_y  # Start at the base_y position
-
-        # Adjust column sizes: Left 2/3, Right 1/3
-        dialogue_box = pygame.Rect(0, dialogue_y, width * 2 / 3, dialogue_height)
-        details_box_width = width * 1 / 3
-        details_box_x = width * 2 / 3
-
-        # Create semi-transparent background for entire dialogue area
-        full_bg = pygame.Surface((width, total_dialogue_height), pygame.SRCALPHA)
-        full_bg.fill((0, 0, 0, 200))
-        surface.blit(full_bg, (0, base_y))
-
-        # Create semi-transparent background for dialogue
-        dialogue_surface = pygame.Surface((dialogue_box.width, dialogue_height), pygame.SRCALPHA)
-        dialogue_surface.fill((0, 0, 0, 100))  # Slightly transparent black
-        surface.blit(dialogue_surface, (0, dialogue_y))
+        layout = self._get_layout(surface.get_size())
+        current_time = now_ms if now_ms is not None else pygame.time.get_ticks()
+
+        # scroll_offset is clamped wherever it or the history changes
+        max_scroll_offset = self._max_scroll_offset()
+
+        # The panel only needs redrawing when something shown on it changed
+        npc = self.current_npc
+        show_goodbye = bool(self.goodbye_message) and current_time - self.goodbye_timer < 5000
+        cursor_visible = current_time % 1000 < 500
+        panel_key = (
+            layout["size"],
+            self._history_version,
+            self.scroll_offset,
+            self.player_input,
+            cursor_visible,
+            self.goodbye_message if show_goodbye else None,
+            (npc.personality, npc.location_id, npc.backstory, npc.friendship, npc.attributes["health"],
+             npc.economics["gold"], npc.attributes["mana"]) if npc else None
+        )
+        if panel_key != self._panel_key:
+            self._draw_panel(layout, max_scroll_offset, show_goodbye, cursor_visible)
+            self._panel_key = panel_key
+
+        surface.blit(layout["panel"], (0, layout["base_y"]))
+
+    def _draw_panel(self, layout, max_scroll_offset, show_goodbye, cursor_visible):
+        """Draw the whole dialogue UI onto the layout's panel"""
+        panel = layout["panel"]
+        dialogue_y = layout["dialogue_y"]
+        dialogue_height = layout["dialogue_height"]
+        details_box_x = layout["details_box_x"]
+        details_box_width = layout["details_box_width"]
+        line_height = layout["line_height"]
+        max_visible_lines = layout["max_visible_lines"]
+
+        # Semi-transparent background for entire dialogue area, then the dialogue itself
+        panel.fill((0, 0, 0, 200))
+        panel.blit(layout["dialogue_bg"], (0, dialogue_y))
 
         # Draw border
-        pygame.draw.rect(surface, WHITE, dialogue_box, 2)
-
-        # Get NPC name if available
-        npc_name = self.current_npc.name if self.current_npc else "NPC"
-
-        # Calculate max entries based on available height
-        line_height = self.font.get_height() + 2
-        max_visible_lines = int((dialogue_height - 20) / line_height)  # Subtract padding
-
-        # Prepare dialogue entries with line wrapping
-        total_lines = []
-        for entry in self.dialogue_history:
-            speaker = entry["speaker"]
-            text = entry["text"]
-
-            if speaker == "player":
-                text_color = LIGHT_BLUE
-                display_name = "You"
-            else:
-                text_color = YELLOW
-                display_name = npc_name
-
-            wrapped_lines = [
-                {"speaker": display_name, "text": line, "color": text_color}
-                for line in textwrap.wrap(f"{display_name}: {text}", width=40)
-            ]
-            total_lines.extend(wrapped_lines)
-
-        # Apply scrolling
-        total_line_count = len(total_lines)
-        max_scroll_offset = max(0, total_line_count - max_visible_lines)
-        self.scroll_offset = max(0, min(self.scroll_offset, max_scroll_offset))
+        pygame.draw.rect(panel, WHITE, layout["dialogue_box"], 2)
 
         # Show scroll indicators
         if max_scroll_offset > 0:
             if self.scroll_offset < max_scroll_offset:
-                up_triangle_points = [
-                    (width // 3 - 10, dialogue_y + 10),
-                    (width // 3, dialogue_y + 5),
-                    (width // 3 + 10, dialogue_y + 10)
-                ]
-                pygame.draw.polygon(surface, WHITE, up_triangle_points)
+                pygame.draw.polygon(panel, WHITE, layout["up_triangle"])
             if self.scroll_offset > 0:
-                down_triangle_points = [
-                    (width // 3 - 10, dialogue_y + dialogue_height - 10),
-                    (width // 3, dialogue_y + dialogue_height - 5),
-                    (width // 3 + 10, dialogue_y + dialogue_height - 10)
-                ]
-                pygame.draw.polygon(surface, WHITE, down_triangle_points)
+                pygame.draw.polygon(panel, WHITE, layout["down_triangle"])
 
         # Render visible lines
-        start_line = max(0, total_line_count - max_visible_lines - self.scroll_offset)
+        start_line = max(0, len(self._history_lines) - max_visible_lines - self.scroll_offset)
         end_line = start_line + max_visible_lines
-        visible_lines = total_lines[start_line:end_line]
-        for i, line in enumerate(visible_lines):
-            text_surface = self.font.render(line['text'], True, line['color'])
-            surface.blit(text_surface, (DIALOG_PADDING + 10, dialogue_y + 10 + i * line_height))
+        visible_lines = itertools.islice(self._history_lines, start_line, end_line)
+        for i, (line_text, line_color) in enumerate(visible_lines):
+            text_surface = render_text(self.font, line_text, line_color)
+            panel.blit(text_surface, (DIALOG_PADDING + 10, dialogue_y + 10 + i * line_height))
 
         # Render NPC details and real-time friendship bar in the right column
         if self.current_npc:
-            details_box = pygame.Rect(details_box_x, dialogue_y, details_box_width, dialogue_height)
-
-            # Semi-transparent background for details
-            details_surface = pygame.Surface((details_box_width, dialogue_height), pygame.SRCALPHA)
-            details_surface.fill((50, 50, 50, 200))  # Darker semi-transparent background
-            surface.blit(details_surface, (details_box_x, dialogue_y))
+            # Darker semi-transparent background for details
+            panel.blit(layout["details_bg"], (details_box_x, dialogue_y))
 
             # Draw border
-            pygame.draw.rect(surface, WHITE, details_box, 2)
+            pygame.draw.rect(panel, WHITE, layout["details_box"], 2)
 
             # Check if there's a goodbye message and it's still active
-            current_time = pygame.time.get_ticks()
-            if self.goodbye_message and current_time - self.goodbye_timer < 5000:
+            if show_goodbye:
                 # Render centered goodbye message
-                goodbye_surface = self.header_font.render(self.goodbye_message, True, WHITE)
+                goodbye_surface = render_text(self.header_font, self.goodbye_message, WHITE)
                 text_rect = goodbye_surface.get_rect(
                     centerx=int(details_box_x + details_box_width / 2),
                     centery=int(dialogue_y + dialogue_height / 2)
                 )
-                surface.blit(goodbye_surface, text_rect)
+                panel.blit(goodbye_surface, text_rect)
             else:
                 # NPC Details when not showing goodbye message
                 details_y = dialogue_y + 10
-                details = [
-                    f"Personality: {self.current_npc.personality}",
-                    f"Location: {self.current_npc.location_id}",
-                    f"Backstory: {textwrap.shorten(self.current_npc.backstory, width=30)}"
-                ]
-                for detail in details:
-                    detail_surface = self.font.render(detail, True, WHITE)
-                    surface.blit(detail_surface, (details_box_x + 10, details_y))
+                for detail_surface in self._get_detail_surfaces(self.current_npc):
+                    panel.blit(detail_surface, (details_box_x + 10, details_y))
                     details_y += self.font.get_height() + 3  # Reduced spacing
 
-                # Define bar data with more compact layout
-                bars = [
-                    ("Friendship", self.current_npc.friendship, 100, (0, 255, 0)),  # Green
-                    ("Health", self.current_npc.attributes["health"], 100, (255, 0, 0)),  # Red
-                    ("Wealth", self.current_npc.economics["gold"], 500, (255, 215, 0)),  # Gold
-                    ("Mana", self.current_npc.attributes["mana"], 100, (0, 0, 255))  # Blue
-                ]
-
-                # Find the maximum label width to determine alignment
-                max_label_width = max(self.font.size(bar_label)[0] for bar_label, _, _, _ in bars)
-                fixed_bar_x = details_box_x + 10 + max_label_width  # Align all bars at the same x-position, immediately after the longest label
-
-                # Render each bar with its label - More compact layout, with pixel-perfect horizontal and vertical alignment
-                bar_y = details_y + 5  # Tighter spacing for better alignment, adjusted
-                bar_width = 180  # Match screenshot width
-                bar_height = 11  # Match screenshot height
-                for label, value, max_value, color in bars:
-                    # Render label (left-aligned, simple, fully covered, matching your request)
-                    label_surface = self.font.render(label, True, WHITE)  # White text on gray, matching your request
-                    surface.blit(label_surface, (details_box_x + 10, bar_y))
-
-                    # Calculate vertical position to align bar with text baseline (fine-tuned for pixel-perfect alignment)
-                    label_height = label_surface.get_height()  # Get the height of the label text (16px for Arial 16)
-                    bar_y_offset = 3  # Fine-tuned offset to align bars with text baseline (adjust if needed for perfection)
-
-                    # Draw bar background (gray, matching background, simple, fully covered, vertically aligned with text)
-                    bar_x = fixed_bar_x + 10  # Use fixed position for all bars, aligning them horizontally
-                    bar_rect = pygame.Rect(bar_x, bar_y + bar_y_offset, bar_width, bar_height)
-                    pygame.draw.rect(surface, (128, 128, 128),  # Gray background, matching your request
-                                     bar_rect)
-
-                    # Draw filled portion with screenshot colors, simple, fully covered, vertically aligned with text
-                    filled_width = int((value / max_value) * bar_width)
-                    pygame.draw.rect(surface, color,
-                                     (bar_x, bar_y + bar_y_offset, filled_width, bar_height))
-
-                    # Draw border (optional, thin white border for clarity, simple, fully covered, vertically aligned with text)
-                    pygame.draw.rect(surface, WHITE,
-                                     (bar_x, bar_y + bar_y_offset, bar_width, bar_height), 1)
-
-                    bar_y += 30  # Slightly tighter spacing for exact match, matching your request, fully covered
+                # Stat bars: the prebuilt troughs, then each label and the filled part inside the border
+                npc = self.current_npc
+                values = (npc.friendship, npc.attributes["health"], npc.economics["gold"], npc.attributes["mana"])
+                stat_bars = layout["stat_bars"]
+                panel.blit(stat_bars["overlay"], stat_bars["pos"])
+                for (label, max_value, color), value, (label_surface, label_pos), (fill_x, fill_y) in zip(
+                        _STAT_BARS, values, stat_bars["labels"], stat_bars["fills"]):
+                    panel.blit(label_surface, label_pos)
+                    filled_width = min(int((value / max_value) * STAT_BAR_WIDTH), STAT_BAR_WIDTH - 1) - 1
+                    if filled_width > 0:
+                        pygame.draw.rect(panel, color, (fill_x, fill_y, filled_width, STAT_BAR_HEIGHT - 2))
 
             # Draw input box
-            input_box = pygame.Rect(
-                DIALOG_PADDING,
-                input_box_y,
-                width - (DIALOG_PADDING * 2),
-                input_box_height - 10
-            )
-            pygame.draw.rect(surface, DARK_GRAY, input_box)
-            pygame.draw.rect(surface, WHITE, input_box, 1)
+            input_box = layout["input_box"]
+            pygame.draw.rect(panel, DARK_GRAY, input_box)
+            pygame.draw.rect(panel, WHITE, input_box, 1)
 
             # Render current input
-            input_surface = self.font.render(self.player_input, True, WHITE)
-            surface.blit(input_surface, (input_box.x + 5, input_box.y + 5))
+            input_surface = render_text(self.font, self.player_input, WHITE)
+            panel.blit(input_surface, (input_box.x + 5, input_box.y + 5))
 
             # Draw blinking cursor
-            if pygame.time.get_ticks() % 1000 < 500:
-                cursor_x = input_box.x + 5 + self.font.size(self.player_input)[0]
+            if cursor_visible:
+                cursor_x = input_box.x + 5 + input_surface.get_width()
                 cursor_y = input_box.y + 5
                 pygame.draw.line(
-                    surface,
+                    panel,
                     WHITE,
                     (cursor_x, cursor_y),
                     (cursor_x, cursor_y + self.font.get_height()),
@@ -1,9 +1,25 @@
 import random
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from constants import *
 logging.basicConfig(level=logging.DEBUG if __debug__ else logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fallback lines used when an NPC can't generate its own; {name} is the other NPC
+_FALLBACK_GREETINGS = (
+    "Hello, {name}. How are you today?",
+    "Greetings, {name}!",
+    "Good to see you, {name}.",
+    "Hi there, {name}."
+)
+_FALLBACK_RESPONSES = (
+    "I see.",
+    "Interesting.",
+    "That's good to know.",
+    "Thanks for telling me, {name}.",
+    "Indeed."
+)
+
 
 class NPCInteractionManager:
     """Manages interactions between NPCs in the game world"""
@@ -17,6 +33,10 @@ class NPCInteractionManager:
         self.last_interaction_time = {}  # Tracks cooldown per NPC pair
         self.speech_font = pygame.font.SysFont('Arial', 14)
 
+        # Lines come from the dialogue model, which can take seconds to answer,
+        # so they are generated off the game loop and picked up once ready
+        self._line_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="npc-chatter")
+
         # Debugging flag
         self.debug = __debug__
 
@@ -47,6 +67,10 @@ class NPCInteractionManager:
 
         return self.interactions_enabled
 
+    def shutdown(self):
+        """Stop the chatter threads, dropping lines not yet generated; call when the game exits"""
+        self._line_pool.shutdown(wait=False, cancel_futures=True)
+
     def initialize_npcs(self, npcs):
         """Set up interaction attributes for NPCs"""
         for npc in npcs:
@@ -106,6 +130,10 @@ class NPCInteractionManager:
                 npc2.interaction_partner = None
                 npc2.interaction_message = None
 
+                # Drop a line that is still being generated
+                if data['pending']:
+                    data['pending'][0].cancel()
+
                 to_remove.append(interaction_id)
 
                 if self.debug:
@@ -123,6 +151,10 @@ class NPCInteractionManager:
         if len(npcs) < 2:
             return
 
+        # Compare squared distances so no sqrt is needed per pair; derived here so
+        # changes to interaction_distance take effect
+        max_distance_sq = self.interaction_distance * self.interaction_distance
+
         # Check all pairs of NPCs
         for i, npc1 in enumerate(npcs):
             # Skip if already interacting
@@ -134,11 +166,8 @@ class NPCInteractionManager:
                 if npc2.is_interacting:
                     continue
 
-                # Calculate distance between NPCs
-                distance = npc1.distance_to(npc2)
-
                 # Check if they're close enough
-                if distance <= self.interaction_distance:
+                if npc1.distance_sq_to(npc2) <= max_distance_sq:
                     # Check cooldown
                     pair_id = f"{min(npc1.entity_id, npc2.entity_id)}-{max(npc1.entity_id, npc2.entity_id)}"
                     last_time = self.last_interaction_time.get(pair_id, 0)
@@ -156,36 +185,11 @@ class NPCInteractionManager:
         npc2.is_interacting = True
         npc2.interaction_partner = npc1
 
-        # Generate greeting
+        # Generate greeting in the background; it shows up once it's ready
         environment_state = game_state.get_environment_state(npc1.location_id)
-        try:
-            # Get response from NPC
-            response = npc1.simulate_npc_response(environment_state, f"Greeting to {npc2.name}")
-
-            # Check if response is a tuple (response text, adjustment, is_farewell)
-            if isinstance(response, tuple):
-                greeting = response[0]  # Get just the text part
-            else:
-                greeting = response
-
-            # Clean up the greeting text (remove quotes if present)
-            greeting = greeting.strip('"')
-
-            logger.debug(f"Initial greeting: {response}")
-        except Exception as e:
-            # Fallback to random greeting
-            greeting_options = [
-                f"Hello, {npc2.name}. How are you today?",
-                f"Greetings, {npc2.name}!",
-                f"Good to see you, {npc2.name}.",
-                f"Hi there, {npc2.name}."
-            ]
-            greeting = random.choice(greeting_options)
-            logger.error(f"Error generating greeting: {e}")
-
-        # Set greeting as interaction message
-        npc1.interaction_message = greeting
-        npc1.message_time = current_time
+        fallback = random.choice(_FALLBACK_GREETINGS).format(name=npc2.name)
+        greeting = self._line_pool.submit(self._generate_line, npc1, environment_state,
+                                          f"Greeting to {npc2.name}", fallback)
 
         # Record interaction
         interaction_id = f"{current_time}-{npc1.entity_id}-{npc2.entity_id}"
@@ -194,7 +198,8 @@ class NPCInteractionManager:
             'npc2': npc2,
             'start_time': current_time,
             'last_message_time': current_time,
-            'last_speaker': npc1
+            'last_speaker': npc1,
+            'pending': (greeting, npc1)  # (future, speaker) of the line being generated
         }
 
         # Update cooldown
@@ -213,6 +218,25 @@ class NPCInteractionManager:
             return
 
         for interaction_id, data in self.active_interactions.items():
+            # Show a finished line; while one is still generating, wait for it
+            if data['pending']:
+                future, speaker = data['pending']
+                if not future.done():
+                    continue
+                data['pending'] = None
+                line, adjustment, is_farewell = future.result()
+                speaker.interaction_message = line
+                speaker.message_time = current_time
+
+                # The line was generated off the game loop; its effects land here
+                if adjustment:
+                    speaker.update_friendship(adjustment)
+                if is_farewell:
+                    speaker.set_floating_text(line, 5000)
+                data['last_speaker'] = speaker
+                data['last_message_time'] = current_time
+                continue
+
             npc1 = data['npc1']
             npc2 = data['npc2']
             last_speaker = data['last_speaker']
@@ -223,8 +247,7 @@ class NPCInteractionManager:
                 continue
 
             # Determine who speaks next
-            next_speaker = npc2 if last_speaker == npc1 else npc1
-            listener = npc1 if next_speaker == npc2 else npc2
+            next_speaker = npc2 if last_speaker is npc1 else npc1
 
             # If next speaker already has a message, skip
             if next_speaker.interaction_message and current_time - next_speaker.message_time < 4000:
@@ -233,37 +256,43 @@ class NPCInteractionManager:
             # Get the previous message
             previous_message = last_speaker.interaction_message
 
-            # Generate response
-            try:
-                environment_state = game_state.get_environment_state(next_speaker.location_id)
-                response = next_speaker.simulate_npc_response(environment_state, previous_message)
+            # Generate response in the background
+            environment_state = game_state.get_environment_state(next_speaker.location_id)
+            fallback = random.choice(_FALLBACK_RESPONSES).format(name=last_speaker.name)
+            data['pending'] = (self._line_pool.submit(self._generate_line, next_speaker,
+                                                      environment_state, previous_message, fallback),
+                               next_speaker)
 
-                # Handle tuple response
-                if isinstance(response, tuple):
-                    message = response[0]  # Get just the text part
-                else:
-                    message = response
-
-                # Clean up message text
-                message = message.strip('"')
-
-            except Exception as e:
-                logger.error(f"Error generating response: {e}")
-                # Fallback responses
-                responses = [
-                    "I see.",
-                    "Interesting.",
-                    "That's good to know.",
-                    f"Thanks for telling me, {last_speaker.name}.",
-                    "Indeed."
-                ]
-                message = random.choice(responses)
-
-            # Update interaction data
-            next_speaker.interaction_message = message
-            next_speaker.message_time = current_time
-            data['last_speaker'] = next_speaker
-            data['last_message_time'] = current_time
+    @staticmethod
+    def _generate_line(npc, environment_state, message, fallback):
+        """
+        Generate what an NPC says next. Runs on the chatter thread pool.
+
+        Args:
+            npc: NPC that is speaking
+            environment_state: Environment state captured when the line was requested
+            message: Message the NPC is replying to
+            fallback: Line to use if generation fails
+
+        Returns:
+            tuple: (line cleaned of surrounding quotes, friendship adjustment, is_farewell);
+            nothing on the NPC is changed until update_conversations collects it
+        """
+        try:
+            response = npc.simulate_npc_response(environment_state, message)
+
+            # Handle tuple response (response text, adjustment, is_farewell)
+            adjustment, is_farewell = 0, False
+            if isinstance(response, tuple):
+                response, adjustment, is_farewell = response
+
+            logger.debug(f"Generated line for {npc.name}: {response}")
+
+            # Clean up message text
+            return response.strip('"'), adjustment, is_farewell
+        except Exception as e:
+            logger.error(f"Error generating line: {e}")
+            return fallback, 0, False
 
     def _render_speech_bubble(self, surface, text, x, y, cache=None):
         """Render a speech bubble with caching"""
@@ -43,21 +43,16 @@ class NPCObserverSystem:
     def _get_witnesses(self, game_map, player):
         """Find NPCs who can see the player right now"""
         witnesses = []
+        close_sq = (self.observation_radius * 0.5) ** 2
 
-        for npc in game_map.npcs:
-            # Calculate distance to player
+        # Only NPCs in the spatial hash cells around the player can be in range
+        for npc in game_map.get_npcs_near_position(player.x, player.y, self.observation_radius):
             dx = npc.x - player.x
             dy = npc.y - player.y
-            distance = math.sqrt(dx * dx + dy * dy)
 
-            # Check if in observation range
-            if distance <= self.observation_radius:
-                # Check if NPC is facing approximately the right direction
-                is_facing_player = self._is_facing_towards(npc, player)
-
-                # Either very close or facing the right way
-                if distance <= self.observation_radius * 0.5 or is_facing_player:
-                    witnesses.append(npc)
+            # Either very close or facing approximately the right direction
+            if dx * dx + dy * dy <= close_sq or self._is_facing_towards(npc, player):
+                witnesses.append(npc)
 
         return witnesses
 
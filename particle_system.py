@@ -1,6 +1,7 @@
 # particle_system.py
 import pygame
 import math
+from itertools import compress
 from pygame import gfxdraw
 
 class ParticleSystem:
@@ -24,4 +25,60 @@ class ParticleSystem:
             pos_x, pos_y = p['x'] - camera_x, p['y'] - camera_y
             size = p['size'] * life_pct
             if size > 0.5:
-                gfxdraw.filled_circle(surface, int(pos_x), int(pos_y), int(size), tuple(color))
\ No newline at end of file
+                gfxdraw.filled_circle(surface, int(pos_x), int(pos_y), int(size), tuple(color))
+
+
+class FootstepParticles:
+    """
+    Footstep particles kept as parallel lists (one list per field)
+    instead of a list of per-particle dicts.
+    """
+
+    def __init__(self):
+        self.xs = []
+        self.ys = []
+        self.sizes = []
+        self.rgbs = []
+        self.alphas = []  # Base alpha, or None for opaque particles
+        self.lives = []
+        self.created = []
+
+    def __len__(self):
+        return len(self.xs)
+
+    def add(self, x, y, size, color, lifetime, current_time):
+        self.xs.append(x)
+        self.ys.append(y)
+        self.sizes.append(size)
+        # Split the color once here so render only scales the alpha
+        self.rgbs.append(tuple(color[:3]))
+        self.alphas.append(color[3] if len(color) > 3 else None)
+        self.lives.append(lifetime)
+        self.created.append(current_time)
+
+    def expire(self, current_time):
+        """Drop particles whose lifetime has run out"""
+        alive = [current_time - created < life for created, life in zip(self.created, self.lives)]
+        if all(alive):
+            return
+        self.xs = list(compress(self.xs, alive))
+        self.ys = list(compress(self.ys, alive))
+        self.sizes = list(compress(self.sizes, alive))
+        self.rgbs = list(compress(self.rgbs, alive))
+        self.alphas = list(compress(self.alphas, alive))
+        self.lives = list(compress(self.lives, alive))
+        self.created = list(compress(self.created, alive))
+
+    def render(self, surface, camera_x, camera_y, current_time):
+        for x, y, size, (r, g, b), alpha, life, created in zip(self.xs, self.ys, self.sizes, self.rgbs,
+                                                               self.alphas, self.lives, self.created):
+            life_pct = 1.0 - ((current_time - created) / life)
+            size = size * life_pct
+            if size <= 0.5:  # Only draw if big enough
+                continue
+            if alpha is not None:
+                # Use gfxdraw for anti-aliased circle with alpha
+                gfxdraw.filled_circle(surface, int(x - camera_x), int(y - camera_y), int(size),
+                                      (r, g, b, int(alpha * life_pct)))
+            else:
+                pygame.draw.circle(surface, (r, g, b), (int(x - camera_x), int(y - camera_y)), int(size))
\ No newline at end of file
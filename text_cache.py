@@ -0,0 +1,21 @@
+# text_cache.py
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def render_text(font, text, color):
+    """
+    Render text with a font, reusing the surface for repeated strings.
+
+    Font.render rasterizes glyphs on every call, so HUD and dialogue
+    strings that stay the same between frames are served from this cache.
+
+    Args:
+        font (pygame.font.Font): Font to render with
+        text (str): Text to render
+        color (tuple): RGB color of the text
+
+    Returns:
+        pygame.Surface: The rendered (antialiased) text surface
+    """
+    return font.render(text, True, color)